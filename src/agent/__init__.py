@@ -1,20 +1,58 @@
 """
 LangGraph Agent Package
 """
-from .graph import AgentState, build_graph
+from .graph import AgentState, build_graph, agent_version
+from .cache import AnswerCache
+from .hedging import HedgedChatModel, HedgePolicy
+from .deadline import Deadline, DeadlineExceeded, deadline_scope
+from .resources import QuestionResources, question_resources
+from .metrics import Metrics, metrics
+from .runner import SmartyAgent, metrics_report
+from .workqueue import WorkQueue
+from .jobs import Job, JobManager, JobRejected
+from .plans import PlanLibrary, PlanTemplate
+from .prefetch import AttachmentPrefetcher, prefetcher
 from .models import Plan, Act, Response
-from .llms import executor_model, planner_model, replanner_model
-from .tools import wikipedia_search_tool, tavily_search_tool
+from .llms import executor_model, planner_model, replanner_model, STATIC_PREFIX_TOKENS
+from .prompting import cached_token_ratios
+from .tools import wikipedia_search_tool, wikipedia_page_tool, tavily_search_tool, multi_search_tool
+from .wiki import WikipediaClient
 
 __all__ = [
     'AgentState',
     'build_graph',
+    'agent_version',
+    'AnswerCache',
+    'HedgedChatModel',
+    'HedgePolicy',
+    'Deadline',
+    'DeadlineExceeded',
+    'deadline_scope',
+    'QuestionResources',
+    'question_resources',
+    'Metrics',
+    'metrics',
+    'SmartyAgent',
+    'metrics_report',
+    'WorkQueue',
+    'Job',
+    'JobManager',
+    'JobRejected',
+    'PlanLibrary',
+    'PlanTemplate',
+    'AttachmentPrefetcher',
+    'prefetcher',
     'Plan',
     'Act', 
     'Response',
     'executor_model',
     'planner_model',
     'replanner_model',
+    'STATIC_PREFIX_TOKENS',
+    'cached_token_ratios',
     'wikipedia_search_tool',
-    'tavily_search_tool'
+    'wikipedia_page_tool',
+    'WikipediaClient',
+    'tavily_search_tool',
+    'multi_search_tool',
 ] 
\ No newline at end of file
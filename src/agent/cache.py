@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+# MinHash / LSH parameters: 16 bands of 4 rows detect pairs with Jaccard >= ~0.5
+# with high probability, the final decision is made on the estimated similarity.
+NUM_PERM = 64
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 3
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Bumped when the layout of the answers table changes
+_SCHEMA_VERSION = 3
+
+_rng = random.Random(1337)
+_PERMUTATIONS = [
+    (_rng.randint(1, _MERSENNE_PRIME - 1), _rng.randint(0, _MERSENNE_PRIME - 1))
+    for _ in range(NUM_PERM)
+]
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question so that trivial rewordings (case, punctuation, whitespace, accents) hash the same.
+    """
+    text = unicodedata.normalize("NFKD", question or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+def question_hash(question: str) -> str:
+    return hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+
+def _shingles(normalized: str) -> set:
+    words = normalized.split()
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+def minhash_signature(question: str) -> List[int]:
+    """
+    Compute the MinHash signature of the word shingles of a question.
+    """
+    shingles = _shingles(normalize_question(question))
+    if not shingles:
+        return [_MAX_HASH] * NUM_PERM
+    base = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles]
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in base)
+        for a, b in _PERMUTATIONS
+    ]
+
+def estimate_similarity(sig1: List[int], sig2: List[int]) -> float:
+    return sum(1 for x, y in zip(sig1, sig2) if x == y) / NUM_PERM
+
+def _shareable(task_id: Optional[str], file_name: Optional[str]) -> bool:
+    """
+    Whether a question is known to have no attachment (ad-hoc, or an empty file name): only then can its
+    answer be served for, or taken from, another task with the same or a similar question.
+    """
+    return not task_id or file_name == ""
+
+class AnswerCache:
+    """
+    Persistent question-level answer cache.
+
+    Answers are stored in SQLite keyed by task_id and the hash of the normalized question (ad-hoc questions
+    have no task_id). Every entry records the agent version it was produced with; entries from another
+    version are never served.
+    The same wording can come with different attachments, so the answer of another task is only served when
+    neither question has an attachment. A MinHash/LSH index over those questions finds reworded near-duplicates.
+    """
+
+    def __init__(self, path: str, version: str, similarity_threshold: float = 0.8):
+        self.path = path
+        self.version = version
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+            # the cache is disposable: older layouts are dropped
+            self._conn.execute("DROP TABLE IF EXISTS answers")
+            self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS answers (
+                task_id TEXT,
+                question_hash TEXT,
+                version TEXT,
+                question TEXT,
+                answer TEXT,
+                signature TEXT,
+                verified INTEGER DEFAULT 0,
+                created_at REAL,
+                shareable INTEGER DEFAULT 0,
+                PRIMARY KEY (task_id, question_hash, version)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_question ON answers (question_hash, version)")
+        self._conn.commit()
+        # in-memory LSH index for the current version: band key -> question hashes
+        self._buckets: Dict[Tuple[int, tuple], set] = {}
+        self._signatures: Dict[str, List[int]] = {}
+        self._load_index()
+
+    def _load_index(self):
+        rows = self._conn.execute(
+            "SELECT question_hash, signature FROM answers WHERE version = ? AND shareable = 1", (self.version,)
+        ).fetchall()
+        for qhash, signature in rows:
+            self._index(qhash, json.loads(signature))
+
+    def _index(self, qhash: str, signature: List[int]):
+        self._signatures[qhash] = signature
+        for band in range(LSH_BANDS):
+            key = (band, tuple(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]))
+            self._buckets.setdefault(key, set()).add(qhash)
+
+    def _row(self, where: str, params: tuple) -> Optional[dict]:
+        row = self._conn.execute(
+            f"SELECT task_id, question, answer, verified FROM answers WHERE {where} AND version = ? "
+            "ORDER BY verified DESC, created_at DESC",
+            params + (self.version,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"task_id": row[0] or None, "question": row[1], "answer": row[2], "verified": bool(row[3])}
+
+    def get(self, question: str, task_id: Optional[str] = None, file_name: Optional[str] = None) -> Optional[dict]:
+        """
+        Exact lookup by task_id and question, then by question alone if neither side has an attachment.
+        `file_name` is the name of the attachment ('' for none), None if unknown.
+        """
+        qhash = question_hash(question)
+        with self._lock:
+            if task_id:
+                hit = self._row("task_id = ? AND question_hash = ?", (task_id, qhash))
+                if hit or not _shareable(task_id, file_name):
+                    return hit
+            return self._row("question_hash = ? AND shareable = 1", (qhash,))
+
+    def get_similar(self, question: str, task_id: Optional[str] = None, file_name: Optional[str] = None) -> Optional[dict]:
+        """
+        Return the most similar cached entry above the similarity threshold, with its 'similarity'.
+        Only questions without an attachment are compared.
+        """
+        if not _shareable(task_id, file_name):
+            return None
+        signature = minhash_signature(question)
+        with self._lock:
+            candidates = set()
+            for band in range(LSH_BANDS):
+                key = (band, tuple(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]))
+                candidates |= self._buckets.get(key, set())
+            best, best_score = None, 0.0
+            for qhash in candidates:
+                score = estimate_similarity(signature, self._signatures[qhash])
+                if score > best_score:
+                    best, best_score = qhash, score
+            if best is None or best_score < self.similarity_threshold:
+                return None
+            hit = self._row("question_hash = ? AND shareable = 1", (best,))
+        if hit:
+            hit["similarity"] = best_score
+        return hit
+
+    def put(self, question: str, task_id: Optional[str], answer: str, verified: bool = False,
+            file_name: Optional[str] = None):
+        qhash = question_hash(question)
+        signature = minhash_signature(question)
+        shareable = _shareable(task_id, file_name)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (task_id or "", qhash, self.version, question, answer, json.dumps(signature), int(verified), time.time(),
+                 int(shareable)),
+            )
+            self._conn.commit()
+            if shareable:
+                self._index(qhash, signature)
+
+    def mark_verified(self, task_id: str, verified: bool = True):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE answers SET verified = ? WHERE task_id = ? AND version = ?",
+                (int(verified), task_id, self.version),
+            )
+            self._conn.commit()
+
+    def purge_stale(self) -> int:
+        """
+        Delete entries produced by other agent versions. Returns the number of deleted rows.
+        """
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM answers WHERE version != ?", (self.version,))
+            self._conn.commit()
+            return cursor.rowcount
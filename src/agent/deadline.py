@@ -0,0 +1,92 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+# Pool used to run blocking calls that must be abandoned when the deadline passes
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="deadline")
+
+class DeadlineExceeded(Exception):
+    """Raised when the deadline of the current question has passed."""
+
+class Deadline:
+    """
+    Absolute per-question deadline, measured on the monotonic clock.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def near(self, margin: float) -> bool:
+        """Whether less than `margin` seconds are left."""
+        return self.remaining() < margin
+
+    def cancel(self):
+        """Expire the deadline now: the work running under it stops at its next cancellation point."""
+        self.expires_at = time.monotonic()
+
+    def check(self):
+        if self.expired():
+            raise DeadlineExceeded(f"Deadline of {self.seconds:.0f}s exceeded")
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.1f}s)"
+
+# The deadline of the question being answered. Context variables are copied into the threads
+# LangGraph runs nodes and tools in, so every node, model call and tool sees the same deadline.
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]):
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+def check_deadline():
+    """Cooperative cancellation point: raise DeadlineExceeded if the current deadline has passed."""
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check()
+
+def remaining_timeout(default: Optional[float]) -> Optional[float]:
+    """
+    Timeout to use for a blocking call (HTTP request, subprocess): the default capped by the time left.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return default
+    deadline.check()
+    remaining = deadline.remaining()
+    return remaining if default is None else min(default, remaining)
+
+def call_with_deadline(fn: Callable, *args, reserve: float = 0.0, **kwargs):
+    """
+    Call `fn` and give up with DeadlineExceeded once only `reserve` seconds are left before the deadline.
+    The abandoned call keeps running in the background until its own timeout; its result is discarded.
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return fn(*args, **kwargs)
+    budget = deadline.remaining() - reserve
+    if budget <= 0:
+        raise DeadlineExceeded("Not enough time left for this call")
+    context = contextvars.copy_context()
+    future = _executor.submit(context.run, fn, *args, **kwargs)
+    try:
+        return future.result(timeout=budget)
+    except FutureTimeoutError:
+        future.cancel()
+        raise DeadlineExceeded("Call abandoned at the deadline")
@@ -0,0 +1,88 @@
+import contextvars
+import re
+import time
+import unicodedata
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, List, Optional
+from .deadline import Deadline, current_deadline, deadline_scope
+
+_THINK = re.compile(r"<think>.*?</think>", re.DOTALL | re.IGNORECASE)
+_FINAL_ANSWER = re.compile(r"final answer\s*(?:is)?\s*[:\-]?\s*\**\s*(.+)", re.IGNORECASE)
+
+def extract_candidate(output: str) -> str:
+    """
+    Candidate answer of an executor output: the text after the last 'final answer', '' if there is none
+    (outputs without an explicit final answer do not vote). Reasoning blocks (<think>...</think>) are ignored.
+    """
+    text = _THINK.sub("", output or "").strip()
+    matches = _FINAL_ANSWER.findall(text)
+    return matches[-1].strip() if matches else ""
+
+def normalize_candidate(candidate: str) -> str:
+    """
+    Normalize a candidate answer for voting: case, accents, markdown, punctuation and number formatting.
+    """
+    text = unicodedata.normalize("NFKD", candidate)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    text = re.sub(r"[*_`]", "", text)
+    text = re.sub(r"(?<=\d),(?=\d{3}\b)", "", text)
+    text = re.sub(r"\b(\d+)\.0+\b", r"\1", text)
+    text = re.sub(r"[^\w\s.\-]", " ", text)
+    return " ".join(text.split()).strip(" .")
+
+class EnsembleResult:
+    def __init__(self, outputs: List[str], votes: Counter, winner: Optional[str], winner_output: Optional[str]):
+        self.outputs = outputs
+        self.votes = votes
+        self.winner = winner
+        self.winner_output = winner_output
+
+    @property
+    def agreed(self) -> bool:
+        return self.winner is not None
+
+def run_ensemble(branch: Callable[[], str], size: int, quorum: int, timeout: Optional[float] = None) -> EnsembleResult:
+    """
+    Run `size` independent branches concurrently and vote on their normalized candidate answers.
+    Each branch runs under its own deadline (at most `timeout` and the current deadline). As soon as `quorum`
+    branches agree, the deadlines of the others are expired: they stop at their next cancellation point
+    (tool, HTTP request or model call) and their results are discarded.
+    """
+    parent = current_deadline()
+    limits = [seconds for seconds in (timeout, parent.remaining() if parent else None) if seconds is not None]
+    deadlines = [Deadline(min(limits) if limits else float("inf")) for _ in range(size)]
+    executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="ensemble")
+    futures = {executor.submit(contextvars.copy_context().run, _run_branch, branch, deadline) for deadline in deadlines}
+    outputs, votes, first_output = [], Counter(), {}
+    end = None if timeout is None else time.monotonic() + timeout
+    try:
+        pending = futures
+        while pending:
+            remaining = None if end is None else max(0.0, end - time.monotonic())
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                # timeout: vote with what finished
+                break
+            for future in done:
+                if future.exception() is not None:
+                    print(f"Ensemble branch failed: {future.exception()}")
+                    continue
+                output = future.result()
+                outputs.append(output)
+                key = normalize_candidate(extract_candidate(output))
+                if not key:
+                    continue
+                votes[key] += 1
+                first_output.setdefault(key, output)
+                if votes[key] >= quorum:
+                    return EnsembleResult(outputs, votes, key, first_output[key])
+        return EnsembleResult(outputs, votes, None, None)
+    finally:
+        for deadline in deadlines:
+            deadline.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def _run_branch(branch: Callable[[], str], deadline: Deadline) -> str:
+    with deadline_scope(deadline):
+        return branch()
@@ -0,0 +1,138 @@
+"""
+Headless batch evaluation, without gradio.
+
+    python -m agent.eval --input questions.jsonl --output results.jsonl --concurrency 4
+    python -m agent.eval --api-url https://agents-course-unit4-scoring.hf.space --output results.jsonl
+
+Run from the `src` directory. Input lines need a task id (`task_id` or `request_id`) and a question
+(`question`, or `title` and `body`); `file_name` names the attachment. Lines with a reference answer
+(`Final answer`, as in the GAIA metadata, or `expected_answer`) are scored: correct answers are marked verified,
+so that they are served for near-duplicate questions and their plans join the plan library. Results are appended to the output file as soon as each question is
+answered, and questions already present in the output are skipped, so an interrupted run can be resumed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterator, Optional
+import requests
+from .ensemble import normalize_candidate
+from .prefetch import prefetcher
+from .runner import QUESTION_DEADLINE_SECONDS, SmartyAgent, metrics_report
+
+def iter_jsonl_questions(path: str) -> Iterator[dict]:
+    """
+    Lazily read questions from a JSONL file, one line at a time.
+    """
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            task_id = item.get("task_id") or item.get("request_id")
+            question = item.get("question")
+            if question is None and ("title" in item or "body" in item):
+                question = "\n\n".join(part for part in (item.get("title"), item.get("body")) if part)
+            if not task_id or question is None:
+                print(f"Skipping line {line_number} with missing task_id or question", file=sys.stderr)
+                continue
+            yield {"task_id": task_id, "question": question, "file_name": item.get("file_name"),
+                   "expected_answer": item.get("Final answer", item.get("expected_answer"))}
+
+def iter_api_questions(api_url: str) -> Iterator[dict]:
+    response = requests.get(f"{api_url}/questions", timeout=15)
+    response.raise_for_status()
+    questions = response.json()
+    # start downloading every attachment right away, in the background
+    prefetcher.prefetch(questions)
+    for item in questions:
+        if item.get("task_id") and item.get("question") is not None:
+            yield {"task_id": item["task_id"], "question": item["question"], "file_name": item.get("file_name", "")}
+
+def completed_task_ids(path: str) -> set:
+    if not os.path.exists(path):
+        return set()
+    done = set()
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["task_id"])
+            except (ValueError, KeyError):
+                # partially written last line of an interrupted run
+                continue
+    return done
+
+def evaluate(questions: Iterator[dict], output_path: str, concurrency: int = 4,
+             deadline_seconds: Optional[float] = None) -> dict:
+    """
+    Answer `questions` with at most `concurrency` in flight, appending one JSON line per answer to
+    `output_path` (flushed and fsynced). Only the in-flight questions are held in memory.
+    """
+    # no graph rendering: it needs a round trip to the mermaid service
+    agent = SmartyAgent(draw_graph=False)
+    deadline_seconds = deadline_seconds or QUESTION_DEADLINE_SECONDS
+    skip = completed_task_ids(output_path)
+    stats = {"answered": 0, "errors": 0, "skipped": 0, "correct": 0}
+
+    def answer(item: dict) -> dict:
+        start = time.monotonic()
+        try:
+            submitted = agent(item["question"], item["task_id"], deadline_seconds, file_name=item["file_name"])
+            result = {"task_id": item["task_id"], "submitted_answer": submitted}
+        except Exception as e:
+            print(f"Error running agent on task {item['task_id']}: {e}", file=sys.stderr)
+            result = {"task_id": item["task_id"], "submitted_answer": None, "error": str(e)}
+        expected = item.get("expected_answer")
+        if expected is not None and "error" not in result:
+            result["correct"] = normalize_candidate(str(result["submitted_answer"])) == normalize_candidate(str(expected))
+            if result["correct"]:
+                agent.mark_verified(item["task_id"])
+        result["seconds"] = round(time.monotonic() - start, 3)
+        return result
+
+    with open(output_path, "a") as out, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        def write(result: dict):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+            stats["errors" if "error" in result else "answered"] += 1
+            stats["correct"] += int(result.get("correct", False))
+            print(f"[{stats['answered'] + stats['errors']}] {result['task_id']}: {result['submitted_answer']}")
+
+        pending = set()
+        for item in questions:
+            if item["task_id"] in skip:
+                stats["skipped"] += 1
+                continue
+            prefetcher.prefetch([item])
+            # bounded submission window: never read more questions than can run
+            if len(pending) >= concurrency:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    write(future.result())
+            pending.add(executor.submit(answer, item))
+        for future in wait(pending).done:
+            write(future.result())
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless GAIA evaluation")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help="JSONL file of questions")
+    source.add_argument("--api-url", help="base URL of the scoring API, questions are read from /questions")
+    parser.add_argument("--output", required=True, help="JSONL file the results are appended to")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--deadline", type=float, default=None, help="per-question deadline in seconds")
+    args = parser.parse_args(argv)
+
+    questions = iter_jsonl_questions(args.input) if args.input else iter_api_questions(args.api_url)
+    start = time.monotonic()
+    stats = evaluate(questions, args.output, args.concurrency, args.deadline)
+    print(f"Finished in {time.monotonic() - start:.1f}s: {stats}")
+    print(metrics_report())
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,99 @@
+import os
+import sqlite3
+from langchain_core.callbacks import BaseCallbackHandler
 from langgraph.graph import END, START, StateGraph
 from .models import AgentState, Response
-from .llms import executor_model, planner_model, replanner_model, task_prompt_template, final_answer_model
+from .llms import executor_model, planner_model, replanner_model, task_prompt_template, final_answer_model, prompt_fingerprint
 from .tools import download_file_tool
+from .deadline import DeadlineExceeded, call_with_deadline, check_deadline, current_deadline, remaining_timeout
+from .metrics import metrics
+from .plans import PlanLibrary
+from .prefetch import prefetcher
+from .ensemble import run_ensemble
+from .resources import bounded_node, record_download
 from .util import save_graph
 
+# Bump whenever the graph topology or node logic changes: cached answers from other versions are not served
+GRAPH_VERSION = "5"
+
+# Maximum number of react_agent -> replanner rounds
+MAX_ITERATIONS = 6
+# Seconds kept aside for the final answer: below this, the graph stops looping and answers with what it has
+FINAL_ANSWER_RESERVE = 20
+
+# Self-consistency ensemble: number of concurrent executor branches (1 disables it) and votes needed to agree
+ENSEMBLE_SIZE = int(os.getenv("ENSEMBLE_SIZE", 1))
+ENSEMBLE_QUORUM = int(os.getenv("ENSEMBLE_QUORUM", ENSEMBLE_SIZE // 2 + 1))
+
+# Plans for recognized question shapes, served without calling the planner
+plan_library = PlanLibrary(os.getenv("PLAN_LIBRARY_PATH", os.path.join(".cache", "plans.sqlite")))
+
+class DeadlineCallback(BaseCallbackHandler):
+  """
+  Makes every model and tool call of the executor a cancellation point: abandoned runs and cancelled
+  ensemble branches stop at their next call instead of running to completion.
+  """
+  raise_error = True
+
+  def on_chat_model_start(self, *args, **kwargs):
+    check_deadline()
+
+  def on_llm_start(self, *args, **kwargs):
+    check_deadline()
+
+  def on_tool_start(self, *args, **kwargs):
+    check_deadline()
+
+executor_config = {"callbacks": [DeadlineCallback()]}
+
+def agent_version() -> str:
+  return f"{GRAPH_VERSION}-{prompt_fingerprint()}"
+
+def out_of_time(state: AgentState) -> bool:
+  deadline = current_deadline()
+  return state.get("iterations", 0) >= MAX_ITERATIONS or (deadline is not None and deadline.near(FINAL_ANSWER_RESERVE))
+
+def best_answer(state: AgentState) -> str:
+  return state.get("temporary_output") or "No answer was found before the deadline."
+
 # create nodes
 # Plan step
 def plan_step(state: AgentState):
-    plan = planner_model.invoke({"messages": [("user", state["question"])]})
-    return {"plan": plan.steps, "has_file": plan.has_file}
+    file_name = state.get("file_name")
+    match = plan_library.match(state["question"], file_name)
+    if match:
+        metrics.increment(f"plan_library.hit.{match['name']}")
+        return {"plan": match["steps"], "has_file": match["has_file"], "plan_source": match["name"]}
+    metrics.increment("plan_library.miss")
+    try:
+        plan = call_with_deadline(planner_model.invoke, {"messages": [("user", state["question"])]}, reserve=FINAL_ANSWER_RESERVE)
+    except DeadlineExceeded:
+        return {"plan": [state["question"]], "has_file": bool(file_name), "plan_source": "fallback"}
+    # a known attachment decides; the planner only guesses from the wording of the question
+    has_file = plan.has_file if file_name is None else bool(file_name)
+    # candidate for the library, served once the run is verified (ad-hoc questions have no task_id)
+    if state["task_id"]:
+        try:
+            plan_library.record_candidate(state["task_id"], state["question"], plan.steps, has_file)
+        except sqlite3.Error as e:
+            print(f"Could not record the plan of task {state['task_id']}: {e}")
+    return {"plan": plan.steps, "has_file": has_file, "plan_source": "planner"}
 
 # Download file
 def download_file(state: AgentState):
-  file_path = download_file_tool.invoke({"task_id": state["task_id"]})
+  # prefetched attachments are a local lookup; otherwise download now
+  try:
+    file_path = prefetcher.lookup(state["task_id"], timeout=remaining_timeout(60))
+    if file_path:
+      metrics.increment("prefetch.hit")
+      entry = prefetcher.manifest().get(state["task_id"], {})
+      record_download(entry.get("bytes") or os.path.getsize(file_path))
+    else:
+      metrics.increment("prefetch.miss")
+      file_path = download_file_tool.invoke({"task_id": state["task_id"]})
+  except DeadlineExceeded:
+    # no attachment: the executor answers with what it has, or the replanner forces the answer
+    return {"attachment": None}
   return {"attachment": file_path}
 
 # Execute step
@@ -20,27 +101,67 @@ def execute_step(state: AgentState) -> AgentState:
   plan = state["plan"]
   plan_str = "\n".join(f"{i+1}. {step}" for i, step in enumerate(plan))
   task = plan[0]
-  
+
   # Base prompt
   prompt_task_formatted = task_prompt_template.invoke({
       "objective": state["question"],
       "plan_str": plan_str,
       "task_id": state["task_id"]
   }).text
-  
+
   # Add filepath if file exists
   if state["has_file"] and state["attachment"]:
     prompt_task_formatted += f"\n\nFile available at: {state['attachment']}"
-  
+
   # "create_react_agent" works with a messages state by default
-  response = executor_model.invoke({"messages": [("user", prompt_task_formatted)]})
-  return {"temporary_output": response['messages'][-1].content}
+  iterations = state.get("iterations", 0) + 1
+  if ENSEMBLE_SIZE > 1:
+    return execute_ensemble(state, prompt_task_formatted, iterations)
+  try:
+    response = call_with_deadline(executor_model.invoke, {"messages": [("user", prompt_task_formatted)]}, executor_config,
+                                  reserve=FINAL_ANSWER_RESERVE)
+  except DeadlineExceeded:
+    # keep the best output so far, the replanner will force the final answer
+    return {"temporary_output": best_answer(state), "iterations": iterations, "forced_answer": True}
+  return {"temporary_output": response['messages'][-1].content, "iterations": iterations, "forced_answer": False}
+
+def execute_ensemble(state: AgentState, prompt: str, iterations: int):
+  """
+  Run ENSEMBLE_SIZE executor branches concurrently. When ENSEMBLE_QUORUM of them agree, answer directly;
+  otherwise hand the candidates to the replanner.
+  """
+  deadline = current_deadline()
+  timeout = deadline.remaining() - FINAL_ANSWER_RESERVE if deadline else None
+  if timeout is not None and timeout <= 0:
+    return {"temporary_output": best_answer(state), "iterations": iterations, "forced_answer": True}
+
+  def branch():
+    return executor_model.invoke({"messages": [("user", prompt)]}, executor_config)['messages'][-1].content
+
+  result = run_ensemble(branch, ENSEMBLE_SIZE, ENSEMBLE_QUORUM, timeout=timeout)
+  if result.agreed:
+    metrics.increment("ensemble.agreed")
+    metrics.observe("ensemble.branches_used", len(result.outputs))
+    return {"temporary_output": result.winner_output, "answer": result.winner_output, "iterations": iterations, "forced_answer": False}
+
+  metrics.increment("ensemble.disagreed")
+  if not result.outputs:
+    return {"temporary_output": best_answer(state), "iterations": iterations, "forced_answer": True}
+  candidates = "\n".join(f"- {candidate} ({count} of {len(result.outputs)} runs)" for candidate, count in result.votes.most_common())
+  output = f"Independent runs did not agree. Candidate answers:\n{candidates}\n\nFull output of the first run:\n{result.outputs[0]}"
+  return {"temporary_output": output, "iterations": iterations, "forced_answer": False}
 
 # Replan step
 def replan_step(state: AgentState):
-  output = replanner_model.invoke(state)
+  if out_of_time(state):
+      # best answer now: no more replanning
+      return {"answer": best_answer(state), "forced_answer": True}
+  try:
+      output = call_with_deadline(replanner_model.invoke, state, reserve=FINAL_ANSWER_RESERVE)
+  except DeadlineExceeded:
+      return {"answer": best_answer(state), "forced_answer": True}
   if isinstance(output.action, Response):
-      return {"answer": output.action.response}
+      return {"answer": output.action.response, "forced_answer": False}
   else:
       return {"plan": output.action.steps}
 
@@ -50,6 +171,13 @@ def should_download(state: AgentState):
   else:
       return "react_agent"
 
+def after_execute(state: AgentState):
+  # an ensemble quorum answers directly, anything else is checked by the replanner
+  if state.get("answer"):
+      return "final_answer"
+  else:
+      return "replanner"
+
 def should_end(state: AgentState):
   if "answer" in state and state["answer"]:
       return "final_answer"
@@ -57,10 +185,13 @@ def should_end(state: AgentState):
       return "react_agent"
 
 def create_final_answer(state: AgentState):
-  final_answer = final_answer_model.invoke({"question": state["question"], "answer": state["answer"]})
+  try:
+    final_answer = call_with_deadline(final_answer_model.invoke, {"question": state["question"], "answer": state["answer"]})
+  except DeadlineExceeded:
+    return {"answer": state["answer"]}
   return {"answer": final_answer.answer}
 
-def build_graph() -> StateGraph:
+def build_graph(draw: bool = True) -> StateGraph:
   # instantiate graph builder with state
   workflow = StateGraph(AgentState)
 
@@ -72,11 +203,16 @@ def build_graph() -> StateGraph:
      should_download,
      ['react_agent', 'download_file'])
   workflow.add_edge('download_file', 'react_agent')
-  workflow.add_node('react_agent', execute_step)
-  workflow.add_node('replanner', replan_step)
+  # executor and replanner outputs are capped, oversized text is spilled to the question workspace
+  workflow.add_node('react_agent', bounded_node(execute_step))
+  workflow.add_node('replanner', bounded_node(replan_step))
   workflow.add_node('final_answer', create_final_answer)
   workflow.add_edge(START, 'planner')
-  workflow.add_edge('react_agent', 'replanner')
+  workflow.add_conditional_edges(
+    'react_agent',
+    after_execute,
+    ['replanner', 'final_answer'],
+  )
   workflow.add_conditional_edges(
     "replanner",
     should_end,
@@ -86,6 +222,7 @@ def build_graph() -> StateGraph:
 
   # compile graph. generate png image. store in current directory
   graph = workflow.compile()
-  save_graph(graph, 'graph.png')
+  if draw:
+    save_graph(graph, 'graph.png')
 
-  return graph
\ No newline at end of file
+  return graph
@@ -0,0 +1,181 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from pydantic import ConfigDict, Field
+
+# Shared pool for primary and hedge requests of synchronous calls
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+
+class HedgePolicy:
+    """
+    Decides when to fire a hedge request and keeps the hedging metrics.
+
+    The hedge delay of a model is the rolling `percentile` of its last `window` latencies (or `default_delay`
+    until `min_samples` latencies were observed). Hedges are only fired while the share of hedged calls
+    stays under `max_hedge_rate`.
+    """
+
+    def __init__(self, percentile: float = 0.95, window: int = 200, min_samples: int = 20,
+                 default_delay: float = 15.0, max_hedge_rate: float = 0.1):
+        self.percentile = percentile
+        self.window = window
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.max_hedge_rate = max_hedge_rate
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, deque] = {}
+        self._metrics: Dict[str, Dict[str, int]] = {}
+
+    def _model_metrics(self, model: str) -> Dict[str, int]:
+        return self._metrics.setdefault(model, {"calls": 0, "hedges_fired": 0, "hedges_won": 0, "hedges_skipped": 0})
+
+    def hedge_delay(self, model: str) -> float:
+        with self._lock:
+            latencies = self._latencies.get(model)
+            if not latencies or len(latencies) < self.min_samples:
+                return self.default_delay
+            ordered = sorted(latencies)
+            return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+
+    def record_call(self, model: str):
+        with self._lock:
+            self._model_metrics(model)["calls"] += 1
+
+    def record_latency(self, model: str, latency: float):
+        with self._lock:
+            self._latencies.setdefault(model, deque(maxlen=self.window)).append(latency)
+
+    def try_hedge(self, model: str) -> bool:
+        """
+        Reserve a hedge for `model` if the hedge budget allows it.
+        """
+        with self._lock:
+            metrics = self._model_metrics(model)
+            if (metrics["hedges_fired"] + 1) > self.max_hedge_rate * metrics["calls"]:
+                metrics["hedges_skipped"] += 1
+                return False
+            metrics["hedges_fired"] += 1
+            return True
+
+    def record_hedge_won(self, model: str):
+        with self._lock:
+            self._model_metrics(model)["hedges_won"] += 1
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            snapshot = {model: dict(values) for model, values in self._metrics.items()}
+        for model in snapshot:
+            snapshot[model]["hedge_delay"] = self.hedge_delay(model)
+        return snapshot
+
+# Policy shared by all hedged models of the process
+default_policy = HedgePolicy(
+    percentile=float(os.getenv("LLM_HEDGING_PERCENTILE", 0.95)),
+    max_hedge_rate=float(os.getenv("LLM_HEDGING_MAX_RATE", 0.1)),
+)
+
+class HedgedChatModel(BaseChatModel):
+    """
+    Chat model wrapper that sends a duplicate request when the first one is slower than the hedge delay,
+    returns the first response and cancels (or abandons, for sync calls) the other one.
+    """
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: BaseChatModel
+    policy: HedgePolicy = Field(default=default_policy, exclude=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"hedged-{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.inner._identifying_params
+
+    @property
+    def model_key(self) -> str:
+        return getattr(self.inner, "model_name", None) or getattr(self.inner, "model", None) or self.inner._llm_type
+
+    def bind_tools(self, tools, **kwargs):
+        # let the inner model format the tools, then forward the formatted kwargs on every call
+        bound = self.inner.bind_tools(tools, **kwargs)
+        return self.bind(**bound.kwargs)
+
+    def _timed_generate(self, messages, stop, kwargs) -> ChatResult:
+        start = time.monotonic()
+        result = self.inner._generate(messages, stop=stop, **kwargs)
+        self.policy.record_latency(self.model_key, time.monotonic() - start)
+        return result
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        model = self.model_key
+        self.policy.record_call(model)
+        primary = _executor.submit(self._timed_generate, messages, stop, kwargs)
+        done, _ = wait([primary], timeout=self.policy.hedge_delay(model))
+        if done or not self.policy.try_hedge(model):
+            return primary.result()
+
+        hedge = _executor.submit(self._timed_generate, messages, stop, kwargs)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if future is hedge:
+                        self.policy.record_hedge_won(model)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def _timed_agenerate(self, messages, stop, kwargs) -> ChatResult:
+        start = time.monotonic()
+        result = await self.inner._agenerate(messages, stop=stop, **kwargs)
+        self.policy.record_latency(self.model_key, time.monotonic() - start)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        model = self.model_key
+        self.policy.record_call(model)
+        primary = asyncio.ensure_future(self._timed_agenerate(messages, stop, kwargs))
+        done, _ = await asyncio.wait([primary], timeout=self.policy.hedge_delay(model))
+        if done or not self.policy.try_hedge(model):
+            return await primary
+
+        hedge = asyncio.ensure_future(self._timed_agenerate(messages, stop, kwargs))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.policy.record_hedge_won(model)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+def maybe_hedge(model: BaseChatModel) -> BaseChatModel:
+    """
+    Wrap `model` with hedging when the LLM_HEDGING environment variable is set (opt-in).
+    """
+    if os.getenv("LLM_HEDGING", "").lower() in ("1", "true", "yes"):
+        # the wrapper calls the inner model directly, so it takes over its callbacks
+        return HedgedChatModel(inner=model, callbacks=model.callbacks)
+    return model
@@ -0,0 +1,108 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+class JobRejected(Exception):
+    """Raised when the job manager is at capacity."""
+
+class Job:
+    """
+    Evaluation run over a list of questions, with per-question results.
+    """
+
+    def __init__(self, questions: List[dict], on_complete: Optional[Callable[["Job"], str]] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.questions = questions
+        self.on_complete = on_complete
+        self.status = "queued"
+        self.message = ""
+        self.results: List[dict] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def answers_payload(self) -> List[dict]:
+        return [{"task_id": r["Task ID"], "submitted_answer": r["Submitted Answer"]} for r in self.results if not r.get("error")]
+
+    def snapshot(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "message": self.message,
+            "done": len(self.results),
+            "total": len(self.questions),
+            "results": list(self.results),
+        }
+
+class JobManager:
+    """
+    Runs evaluation jobs in the background on a bounded pool sharing one warm agent.
+
+    At most `max_running` jobs run at once and at most `max_queued` more wait; beyond that `submit`
+    raises JobRejected. Finished jobs are kept (the last `keep_finished`) so their results can be polled.
+    """
+
+    def __init__(self, agent_factory: Callable[[], Callable[[str, str], str]], max_running: int = 2,
+                 max_queued: int = 4, keep_finished: int = 50):
+        self.agent_factory = agent_factory
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_running, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+
+    def active(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status in ("queued", "running"))
+
+    def submit(self, questions: List[dict], on_complete: Optional[Callable[[Job], str]] = None) -> Job:
+        job = Job(questions, on_complete)
+        with self._lock:
+            active = sum(1 for j in self._jobs.values() if j.status in ("queued", "running"))
+            if active >= self.max_running + self.max_queued:
+                raise JobRejected(f"Server at capacity ({active} jobs running or queued), please retry later.")
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        # called with the lock held
+        finished = [job for job in self._jobs.values() if job.status in ("done", "failed")]
+        for job in sorted(finished, key=lambda j: j.finished_at or 0)[:-self.keep_finished or None]:
+            del self._jobs[job.id]
+
+    def _run(self, job: Job):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            agent = self.agent_factory()
+            for item in job.questions:
+                task_id, question_text = item.get("task_id"), item.get("question")
+                try:
+                    answer = agent(question_text, task_id, file_name=item.get("file_name"))
+                    job.results.append({"Task ID": task_id, "Question": question_text, "Submitted Answer": answer})
+                except Exception as e:
+                    print(f"Error running agent on task {task_id}: {e}")
+                    job.results.append({"Task ID": task_id, "Question": question_text,
+                                        "Submitted Answer": f"AGENT ERROR: {e}", "error": True})
+                job.message = f"Answered {len(job.results)}/{len(job.questions)} questions."
+            if job.on_complete:
+                job.message = job.on_complete(job)
+            else:
+                job.message = f"Agent finished running on {len(job.results)} questions."
+            job.status = "done"
+        except Exception as e:
+            print(f"Job {job.id} failed: {e}")
+            job.message = f"Job failed: {e}"
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
@@ -2,18 +2,19 @@ from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
 from langchain_groq import ChatGroq
 from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
-from .tools import wikipedia_search_tool, tavily_search_tool, audio_2_text, read_image, execute_code_from_file, read_excel_file, calculator, query_video
+from .tools import wikipedia_search_tool, wikipedia_page_tool, tavily_search_tool, multi_search_tool, audio_2_text, read_image, execute_code_from_file, read_excel_file, read_spilled_output, calculator, query_video
 from .models import Plan, Act, FinalAnswer
+from .hedging import maybe_hedge
+from .prompting import PromptCacheTracker, static_prefix_tokens, tool_definitions
+import hashlib
 import os
 
 #################################
 #  Planner
 #################################
-planner_prompt = ChatPromptTemplate.from_messages(
-    [
-        (
-            "system",
-            """
+# Prompts are assembled static-first (instructions, examples) and dynamic-last (question, plan, outputs),
+# so that repeated calls share the longest possible prefix and hit the provider prompt cache.
+planner_system_prompt = """
             You are a skilled business analyst. For the given objective, come up with an ordered sequence of steps that will lead to the final answer. Do not add any superfluous steps.
             
             For example:
@@ -40,33 +41,36 @@ planner_prompt = ChatPromptTemplate.from_messages(
                 (5) return the number of scores the player had and the team they played for
             
             If the task mentions an auxiliar file, let the agent know by setting true the flag 'has_file'. The result of the final step should be the final answer. Make sure that each step has all the information needed - do not skip steps.
-            """,
-        ),
+            """
+
+planner_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", planner_system_prompt),
         ("placeholder", "{messages}"),
     ]
 )
 
 # The pipe operator chains the prompt to the next component (chat llm)
 # langchain processes the object passed to planner_model and passes planner_promot just what it needs
-planner_model = planner_prompt | ChatOpenAI(
-    model="gpt-4o", temperature=0.4
-).with_structured_output(Plan)
+planner_model = planner_prompt | maybe_hedge(ChatOpenAI(
+    model="gpt-4o", temperature=0.4, callbacks=[PromptCacheTracker("planner")]
+)).with_structured_output(Plan)
 
 #################################
 #  Executor
 #################################
+# static instructions live in the executor system prompt, the task prompt only carries the dynamic part
+executor_prompt = """You are a helpful assistant.
+You receive a user request and the plan the team created to respond to it.
+Follow this plan to respond to the user's request. Use intermediate steps and chain multiple tool calls if necessary.
+Return when you have a final answer or have found a blocking issue. In either case, clearly state the final answer or the blocking issue and provide a brief reasoning."""
+
 task_prompt_template = PromptTemplate(
-    # input_variables=["plan_str", "task_id"],
-    template="""
-    User request: {objective}. (task_id: {task_id})
-    
-    To respond to this request, the team created the following plan:
-    {plan_str}
-
-    Follow this plan to respond to the user's request. Use intermediate steps and chain multiple tool calls if necessary.
-    
-    Return when you have a final answer or have found a blocking issue. In either case, clearly state the final answer or the blocking issue and provide a brief reasoning.
-    """
+    # input_variables=["plan_str", "objective", "task_id"],
+    template="""Plan:
+{plan_str}
+
+User request: {objective}. (task_id: {task_id})"""
 )
 
 llm = ChatGroq(
@@ -77,46 +81,54 @@ llm = ChatGroq(
     temperature=0.3,
     max_tokens=None,
     # reasoning_format="parsed",
-    timeout=None,
+    # per-request cap; the question deadline additionally abandons calls that would overrun it
+    timeout=120,
     max_retries=3,
+    callbacks=[PromptCacheTracker("executor")],
   )
 
-tools = [wikipedia_search_tool, tavily_search_tool, audio_2_text, read_image, execute_code_from_file, read_excel_file, calculator, query_video]
-executor_prompt = "You are a helpful assistant."
-executor_model = create_react_agent(llm, tools, prompt=executor_prompt)
+tools = [wikipedia_search_tool, wikipedia_page_tool, tavily_search_tool, multi_search_tool, audio_2_text, read_image, execute_code_from_file, read_excel_file, read_spilled_output, calculator, query_video]
+# hedging (opt-in, LLM_HEDGING=1) duplicates slow model calls, never the tool calls of the react agent
+executor_model = create_react_agent(maybe_hedge(llm), tools, prompt=executor_prompt)
 
 #################################
 #  Replanner
 #################################
-replanner_prompt = ChatPromptTemplate.from_template(
-    """For the given objective, come up with a simple step by step plan. \
+replanner_system_prompt = """For the given objective, come up with a simple step by step plan. \
 This plan should involve individual tasks, that if executed correctly will yield the correct answer. Do not add any superfluous steps. \
 The result of the final step should be the final answer. Make sure that each step has all the information needed - do not skip steps.
 
-Your objective was this:
+You are given your objective, your original plan and the output the react agent returned following the plan.
+You must decide whether to return to the user or continue seeking the solution.
+
+If you need more steps, then adjust the plan accordingly and respond with action Plan.
+If you've reached a final answer, then create an answer and respond with action: Respond."""
+
+replanner_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", replanner_system_prompt),
+        (
+            "user",
+            """Your objective was this:
 {question}
 
 Your original plan was this:
 {plan}
 
 Following the plan, the react agent has returned this output:
-{temporary_output}
-
-You must decide whether to return to the user or continue seeking the solution.
-
-If you need more steps, then adjust the plan accordingly and respond with action Plan.
-If you've reached a final answer, then create an answer and respond with action: Respond."""
+{temporary_output}""",
+        ),
+    ]
 )
 
-replanner_model = replanner_prompt | ChatOpenAI(
-    model="gpt-4o", temperature=0
-).with_structured_output(Act)
+replanner_model = replanner_prompt | maybe_hedge(ChatOpenAI(
+    model="gpt-4o", temperature=0, callbacks=[PromptCacheTracker("replanner")]
+)).with_structured_output(Act)
 
 #################################
 #  Final Answer
 #################################
-final_answer_prompt = ChatPromptTemplate.from_template(
-    """You are a helpful assistant. You are given a question and an answer. You must return the final answer to the question.
+final_answer_system_prompt = """You are a helpful assistant. You are given a question and an answer. You must return the final answer to the question.
     The final answer must be crisp, clear and use proper grammar, with sentence case. If asked a value, return the value. If asked a list, return the list. Make no additional comments, greetings or explanations.
     For example:
 
@@ -130,14 +142,40 @@ final_answer_prompt = ChatPromptTemplate.from_template(
 
     Question: Hey there, your turn. What's the best move?
     Answer: The optimal move in this position it Re6.
-    Final Answer: Re6
+    Final Answer: Re6"""
 
-    Your turn:
+final_answer_prompt = ChatPromptTemplate.from_messages(
+    [
+        ("system", final_answer_system_prompt),
+        (
+            "user",
+            """Your turn:
     Question: {question}
     Answer: {answer}
-    Final Answer: """
+    Final Answer: """,
+        ),
+    ]
 )
 
 final_answer_model = final_answer_prompt | ChatOpenAI(
-    model="gpt-4o", temperature=0
-).with_structured_output(FinalAnswer)
\ No newline at end of file
+    model="gpt-4o", temperature=0, callbacks=[PromptCacheTracker("final_answer")]
+).with_structured_output(FinalAnswer, method="function_calling")  # tool-call arguments stream token by token
+
+# Token counts of the static prefixes, computed once: the tool and output schemas sent with each call are part of them
+STATIC_PREFIX_TOKENS = static_prefix_tokens({
+    "planner": tool_definitions([Plan]) + planner_system_prompt,
+    "executor": tool_definitions(tools) + executor_prompt,
+    "replanner": tool_definitions([Act]) + replanner_system_prompt,
+    "final_answer": tool_definitions([FinalAnswer]) + final_answer_system_prompt,
+})
+
+#################################
+#  Versioning
+#################################
+def prompt_fingerprint() -> str:
+    """
+    Fingerprint of the prompts and models used by the chains. Changes whenever a prompt or model is edited.
+    """
+    parts = [planner_prompt.pretty_repr(), task_prompt_template.template, executor_prompt,
+             replanner_prompt.pretty_repr(), final_answer_prompt.pretty_repr(), llm.model_name]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:12]
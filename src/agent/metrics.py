@@ -0,0 +1,39 @@
+import threading
+from collections import deque
+from typing import Dict
+
+class Metrics:
+    """
+    In-process metrics registry: counters and latency observations (last `window` values per name).
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        self._observations: Dict[str, deque] = {}
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            self._observations.setdefault(name, deque(maxlen=self.window)).append(value)
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            summary = {name: {"count": value} for name, value in self._counters.items()}
+            for name, values in self._observations.items():
+                ordered = sorted(values)
+                summary[name] = {
+                    "count": len(ordered),
+                    "mean": sum(ordered) / len(ordered),
+                    "p50": ordered[len(ordered) // 2],
+                    "p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+                    "max": ordered[-1],
+                }
+        return summary
+
+# Process-wide registry
+metrics = Metrics()
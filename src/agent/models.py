@@ -1,17 +1,21 @@
 from typing_extensions import TypedDict, Annotated
 from operator import add
-from typing import List, Tuple, Union
+from typing import List, Optional, Tuple, Union
 from pydantic import BaseModel, Field
 
 class AgentState(TypedDict):
     """Agent state for LangGraph"""
     task_id: Annotated[str, 'The task_id of the question']
     question: Annotated[str, 'The question to answer']
+    file_name: Annotated[Optional[str], 'The file name of the attachment, empty if none, None if unknown']
     has_file: Annotated[bool, 'Whether the question has a file to download']
     attachment: Annotated[str, 'The attachment to the question']
     plan: Annotated[List[str], 'The plan to answer the question']
+    plan_source: Annotated[str, 'Where the plan comes from: planner, a plan library template or learned']
     temporary_output: Annotated[str, 'The output of the react agent, before validated by the replanner']
     answer: Annotated[str, 'The answer to the question']
+    iterations: Annotated[int, 'The number of react agent rounds so far']
+    forced_answer: Annotated[bool, 'Whether the answer was forced by the deadline or the iteration limit']
 
 # Pydantic models for LangGraph (output interface for specific nodes)
 class Plan(BaseModel):
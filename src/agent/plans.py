@@ -0,0 +1,197 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from .cache import estimate_similarity, minhash_signature
+
+@dataclass
+class PlanTemplate:
+    """
+    Parameterized plan for a recurring question shape.
+
+    A question matches when all `required` patterns and at least one of the `any_of` patterns (if any) match.
+    Templates with a file match on the extension of the attachment; when the attachment of the question is
+    unknown, the `hints` patterns (wording of the question about the attachment) must match instead.
+    Steps are formatted with the question and the named groups captured by the patterns.
+    """
+    name: str
+    steps: List[str]
+    has_file: bool
+    required: List[str]
+    any_of: List[str] = field(default_factory=list)
+    extensions: List[str] = field(default_factory=list)
+    hints: List[str] = field(default_factory=list)
+
+    def match(self, question: str, attachment_name: Optional[str] = None) -> Optional[Dict[str, str]]:
+        """
+        Parameters captured from the question, None if it does not match. `attachment_name` is the file name
+        of the attachment ('' for none), or None if unknown.
+        """
+        patterns = list(self.required)
+        if attachment_name is None:
+            if self.has_file:
+                patterns += self.hints
+        elif self.has_file != bool(attachment_name):
+            return None
+        elif self.has_file and os.path.splitext(attachment_name)[1].lower() not in self.extensions:
+            return None
+        return self._match_patterns(question, patterns)
+
+    def _match_patterns(self, text: str, patterns: List[str]) -> Optional[Dict[str, str]]:
+        params = {}
+        for pattern in patterns:
+            found = re.search(pattern, text, re.IGNORECASE)
+            if not found:
+                return None
+            params.update({k: v for k, v in found.groupdict().items() if v})
+        if self.any_of and not any(re.search(pattern, text, re.IGNORECASE) for pattern in self.any_of):
+            return None
+        return params
+
+    def render(self, question: str, params: Dict[str, str]) -> List[str]:
+        return [step.format(question=question, **params) for step in self.steps]
+
+_ATTACHED = r"\b(attached|attachment|enclosed|provided|the file)\b"
+
+BUILTIN_TEMPLATES = [
+    PlanTemplate(
+        name="youtube_video",
+        steps=[
+            "query the video {video_url} with the query_video tool, asking: {question}",
+            "return the final answer",
+        ],
+        has_file=False,
+        required=[r"(?P<video_url>https?://(www\.)?(youtube\.com/watch\?v=|youtu\.be/)[\w\-]+)"],
+    ),
+    PlanTemplate(
+        name="audio_transcript",
+        steps=[
+            "download the attached audio file if not already available locally",
+            "transcribe the audio file with the audio_2_text tool",
+            "find in the transcript the information needed to answer: {question}",
+            "return the final answer",
+        ],
+        has_file=True,
+        required=[],
+        extensions=[".mp3", ".wav", ".m4a", ".ogg", ".flac"],
+        hints=[r"\b(mp3|audio|recording|voice memo|listen)\b", _ATTACHED],
+    ),
+    PlanTemplate(
+        name="spreadsheet_aggregation",
+        steps=[
+            "download the attached spreadsheet if not already available locally",
+            "read the spreadsheet with the read_excel_file tool",
+            "select the rows and columns needed to answer: {question}",
+            "compute the requested value with the calculator tool in a single expression",
+            "return the final answer",
+        ],
+        has_file=True,
+        required=[],
+        extensions=[".xlsx", ".xls", ".csv"],
+        hints=[r"\b(excel|xlsx|spreadsheet|csv)\b", _ATTACHED],
+    ),
+    PlanTemplate(
+        name="chess_image",
+        steps=[
+            "download the attached image if not already available locally",
+            "read the chess board position from the image with the read_image tool",
+            "determine the move that answers: {question}",
+            "return the move in algebraic notation",
+        ],
+        has_file=True,
+        required=[r"\bchess\b"],
+        extensions=[".png", ".jpg", ".jpeg", ".gif", ".webp"],
+        hints=[r"\b(image|position|board)\b", _ATTACHED],
+    ),
+    PlanTemplate(
+        name="wikipedia_count",
+        steps=[
+            "search Wikipedia for the article mentioned in: {question}",
+            "read the section of the article listing the requested items with the wikipedia_page_tool, pinned to the date or version the question mentions",
+            "count the items matching the criteria of the question",
+            "return the count",
+        ],
+        has_file=False,
+        required=[r"\bwikipedia\b", r"\b(how many|number of)\b"],
+    ),
+]
+
+class PlanLibrary:
+    """
+    Plan templates matched locally on the question, so that the planner LLM call can be skipped.
+
+    Built-in templates cover the recurring GAIA question shapes. The library grows from runs: the plans
+    produced by the planner are stored as candidates, and once a run is verified its plan is served for
+    near-duplicate questions (MinHash similarity above `similarity_threshold`).
+    """
+
+    def __init__(self, path: str, templates: List[PlanTemplate] = BUILTIN_TEMPLATES, similarity_threshold: float = 0.9):
+        self.templates = templates
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS plans (
+                task_id TEXT PRIMARY KEY,
+                question TEXT,
+                steps TEXT,
+                has_file INTEGER,
+                signature TEXT,
+                verified INTEGER DEFAULT 0,
+                created_at REAL
+            )"""
+        )
+        self._conn.commit()
+        self._learned: List[Tuple[List[int], List[str], bool]] = []
+        for steps, has_file, signature in self._conn.execute(
+            "SELECT steps, has_file, signature FROM plans WHERE verified = 1"
+        ).fetchall():
+            self._learned.append((json.loads(signature), json.loads(steps), bool(has_file)))
+
+    def match(self, question: str, attachment_name: Optional[str] = None) -> Optional[dict]:
+        """
+        Returns {"name", "steps", "has_file"} for a confident match, None otherwise.
+        A match is confident when it is a learned plan of a near-duplicate question or exactly one template matches.
+        `attachment_name` is the file name of the attachment ('' for none), or None if unknown.
+        """
+        signature = minhash_signature(question)
+        with self._lock:
+            learned = [(estimate_similarity(signature, sig), steps, has_file) for sig, steps, has_file in self._learned]
+        if learned:
+            score, steps, has_file = max(learned, key=lambda entry: entry[0])
+            if score >= self.similarity_threshold and (attachment_name is None or has_file == bool(attachment_name)):
+                return {"name": "learned", "steps": steps, "has_file": has_file}
+
+        matches = [(template, params) for template in self.templates
+                   if (params := template.match(question, attachment_name)) is not None]
+        if len(matches) != 1:
+            return None
+        template, params = matches[0]
+        return {"name": template.name, "steps": template.render(question, params), "has_file": template.has_file}
+
+    def record_candidate(self, task_id: str, question: str, steps: List[str], has_file: bool):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plans VALUES (?, ?, ?, ?, ?, 0, ?)",
+                (task_id, question, json.dumps(steps), int(has_file), json.dumps(minhash_signature(question)), time.time()),
+            )
+            self._conn.commit()
+
+    def verify(self, task_id: str):
+        """
+        Promote the candidate plan of a verified successful run into the library.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT steps, has_file, signature FROM plans WHERE task_id = ? AND verified = 0", (task_id,)
+            ).fetchone()
+            if row is None:
+                return
+            self._conn.execute("UPDATE plans SET verified = 1 WHERE task_id = ?", (task_id,))
+            self._conn.commit()
+            self._learned.append((json.loads(row[2]), json.loads(row[0]), bool(row[1])))
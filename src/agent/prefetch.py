@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+import requests
+from .tools import FILES_URL, extension_for_content_type
+
+class AttachmentPrefetcher:
+    """
+    Downloads question attachments in the background into a local bundle, so that the `download_file`
+    node is a local lookup and network I/O overlaps with LLM time.
+
+    The bundle is a directory of `<task_id><ext>` files and a `manifest.json` mapping each task_id to its
+    file, so attachments downloaded by an earlier run are reused. At most `max_in_flight` downloads run at once.
+    """
+
+    def __init__(self, bundle_dir: str, max_in_flight: int = 4, timeout: float = 60.0):
+        self.bundle_dir = bundle_dir
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="prefetch")
+        self._futures: Dict[str, Future] = {}
+        os.makedirs(bundle_dir, exist_ok=True)
+        self._manifest_path = os.path.join(bundle_dir, "manifest.json")
+        self._manifest: Dict[str, dict] = {}
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path, "r") as f:
+                self._manifest = json.load(f)
+
+    def _save_manifest(self):
+        # called with the lock held; write then rename so that readers never see a partial manifest
+        tmp_path = f"{self._manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._manifest, f, indent=2)
+        os.replace(tmp_path, self._manifest_path)
+
+    def _download(self, task_id: str, file_name: str = "") -> Optional[str]:
+        start = time.monotonic()
+        with requests.get(f"{FILES_URL}/{task_id}", stream=True, allow_redirects=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            extension = os.path.splitext(file_name)[1] or extension_for_content_type(response.headers.get("content-type", ""))
+            path = os.path.abspath(os.path.join(self.bundle_dir, f"{task_id}{extension}"))
+            tmp_path = f"{path}.part"
+            size = 0
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=1 << 16):
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, path)
+        with self._lock:
+            self._manifest[task_id] = {
+                "path": path,
+                "file_name": file_name,
+                "content_type": response.headers.get("content-type", ""),
+                "bytes": size,
+                "seconds": round(time.monotonic() - start, 3),
+            }
+            self._save_manifest()
+        print(f"Prefetched attachment of task {task_id} to: {path}")
+        return path
+
+    def _cached_path(self, task_id: str) -> Optional[str]:
+        entry = self._manifest.get(task_id)
+        if entry and os.path.exists(entry["path"]):
+            return entry["path"]
+        return None
+
+    def prefetch(self, items: Iterable[dict]) -> int:
+        """
+        Schedule the download of the attachments of `items` (questions with `task_id` and `file_name`).
+        Questions without a file name are skipped. Returns the number of scheduled downloads.
+        """
+        scheduled = 0
+        for item in items:
+            task_id, file_name = item.get("task_id"), item.get("file_name")
+            if not task_id or not file_name:
+                continue
+            with self._lock:
+                if task_id in self._futures or self._cached_path(task_id):
+                    continue
+                self._futures[task_id] = self._executor.submit(self._download, task_id, file_name)
+            scheduled += 1
+        return scheduled
+
+    def lookup(self, task_id: str, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Local path of the attachment of `task_id`, waiting up to `timeout` for an in-flight download.
+        None if it was not prefetched, failed, or is still downloading.
+        """
+        with self._lock:
+            path = self._cached_path(task_id)
+            future = self._futures.get(task_id)
+        if path or future is None:
+            return path
+        try:
+            return future.result(timeout=timeout)
+        except Exception as e:
+            print(f"Prefetch of task {task_id} not available: {e}")
+            return None
+
+    def manifest(self) -> Dict[str, dict]:
+        with self._lock:
+            return dict(self._manifest)
+
+# Process-wide prefetcher used by the download_file node
+prefetcher = AttachmentPrefetcher(
+    os.getenv("ATTACHMENT_BUNDLE_DIR", os.path.join(".cache", "attachments")),
+    max_in_flight=int(os.getenv("ATTACHMENT_PREFETCH_IN_FLIGHT", 4)),
+)
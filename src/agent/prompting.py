@@ -0,0 +1,67 @@
+import json
+from typing import Any, Dict, List
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from .metrics import metrics
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken is optional (installed with langchain-openai)
+    _encoding = None
+
+# OpenAI only caches prompts of at least this many tokens: shorter prefixes always show 0% cached
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+def count_tokens(text: str) -> int:
+    """
+    Number of tokens of `text` (o200k_base, the gpt-4o encoding). Falls back to ~4 characters per token.
+    """
+    if _encoding is None:
+        return len(text) // 4
+    return len(_encoding.encode(text))
+
+def tool_definitions(tools: List[Any]) -> str:
+    """
+    Tools (or structured output schemas) serialized as in the request, where they precede the messages.
+    """
+    return json.dumps([convert_to_openai_tool(t) for t in tools])
+
+def static_prefix_tokens(prompts: Dict[str, str]) -> Dict[str, int]:
+    """
+    Count the tokens of the static prefix of each chain once, at import time.
+    """
+    return {name: count_tokens(text) for name, text in prompts.items()}
+
+class PromptCacheTracker(BaseCallbackHandler):
+    """
+    Callback reading the provider usage metadata of every model call of a chain and recording
+    input tokens and prompt-cache hits (`input_token_details.cache_read`) in the metrics registry.
+    """
+
+    def __init__(self, chain: str):
+        self.chain = chain
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if not usage:
+                    continue
+                cached = (usage.get("input_token_details") or {}).get("cache_read", 0) or 0
+                metrics.increment(f"prompt.{self.chain}.calls")
+                metrics.increment(f"prompt.{self.chain}.input_tokens", usage.get("input_tokens", 0))
+                metrics.increment(f"prompt.{self.chain}.cached_tokens", cached)
+
+def cached_token_ratios(chains: List[str]) -> Dict[str, float]:
+    """
+    Share of input tokens served from the provider prompt cache, per chain.
+    """
+    summary = metrics.summary()
+    ratios = {}
+    for chain in chains:
+        input_tokens = summary.get(f"prompt.{chain}.input_tokens", {}).get("count", 0)
+        cached_tokens = summary.get(f"prompt.{chain}.cached_tokens", {}).get("count", 0)
+        ratios[chain] = cached_tokens / input_tokens if input_tokens else 0.0
+    return ratios
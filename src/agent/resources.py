@@ -0,0 +1,234 @@
+import contextvars
+import functools
+import os
+import shutil
+import tempfile
+import threading
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Optional
+from .metrics import metrics
+
+try:
+    import resource
+except ImportError:  # Unix only: subprocess CPU time is not measured elsewhere
+    resource = None
+
+# Per-question workspaces (downloads, spilled outputs, converted sheets), removed when the question finishes
+WORKSPACE_ROOT = os.getenv("AGENT_WORKSPACE_DIR", os.path.join(tempfile.gettempdir(), "agent-workspaces"))
+# Trace Python allocations to report the peak memory of each question (opt-in: tracing slows every allocation)
+TRACK_MEMORY = os.getenv("TRACK_MEMORY", "0") == "1"
+# Characters of a tool output kept in the executor messages; the rest is spilled to the workspace
+TOOL_OUTPUT_LIMIT = int(os.getenv("TOOL_OUTPUT_LIMIT", 20_000))
+# Characters of the text fields of AgentState; the rest is spilled to the workspace
+STATE_FIELD_LIMITS = {
+    "temporary_output": 20_000,
+    "answer": 20_000,
+}
+
+class QuestionResources:
+    """
+    Workspace directory and resource usage of one question: peak traced memory, bytes downloaded,
+    files created, subprocess CPU time and characters spilled to disk.
+    """
+
+    def __init__(self, task_id: str, root: str = WORKSPACE_ROOT):
+        self.task_id = task_id
+        self.workspace = os.path.join(root, f"{task_id or 'question'}-{uuid.uuid4().hex[:8]}")
+        self._lock = threading.Lock()
+        self.bytes_downloaded = 0
+        self.temp_files = 0
+        self.spilled_chars = 0
+        self.subprocess_cpu_seconds = 0.0
+        self.peak_memory_bytes: Optional[int] = None
+        self.workspace_bytes = 0
+
+    def new_file(self, prefix: str = "tmp_", suffix: str = "") -> str:
+        os.makedirs(self.workspace, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix=prefix, suffix=suffix, dir=self.workspace)
+        os.close(fd)
+        with self._lock:
+            self.temp_files += 1
+        return path
+
+    def record_download(self, size: int):
+        with self._lock:
+            self.bytes_downloaded += size
+
+    def record_subprocess_cpu(self, seconds: float):
+        with self._lock:
+            self.subprocess_cpu_seconds += seconds
+
+    def spill(self, text: str, label: str) -> str:
+        """
+        Save `text` to a file of the workspace and return its path, the handle to read it back.
+        """
+        path = self.new_file(prefix=f"spill_{label}_", suffix=".txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        with self._lock:
+            self.spilled_chars += len(text)
+        return path
+
+    def cleanup(self):
+        """
+        Measure and remove the workspace.
+        """
+        for directory, _, files in os.walk(self.workspace):
+            for name in files:
+                try:
+                    self.workspace_bytes += os.path.getsize(os.path.join(directory, name))
+                except OSError:
+                    pass
+        shutil.rmtree(self.workspace, ignore_errors=True)
+
+    def summary(self) -> dict:
+        return {
+            "peak_memory_bytes": self.peak_memory_bytes,
+            "bytes_downloaded": self.bytes_downloaded,
+            "temp_files": self.temp_files,
+            "workspace_bytes": self.workspace_bytes,
+            "spilled_chars": self.spilled_chars,
+            "subprocess_cpu_seconds": round(self.subprocess_cpu_seconds, 3),
+        }
+
+# The resources of the question being answered, propagated to node and tool threads like the deadline
+_current_resources: contextvars.ContextVar[Optional[QuestionResources]] = contextvars.ContextVar("resources", default=None)
+
+def current_resources() -> Optional[QuestionResources]:
+    return _current_resources.get()
+
+# Questions being traced; tracemalloc is process-wide, so overlapping questions share the peak
+_tracing_lock = threading.Lock()
+_tracing_questions = 0
+_tracing_started = False
+
+def _start_tracing() -> int:
+    global _tracing_questions, _tracing_started
+    with _tracing_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        elif _tracing_questions == 0:
+            tracemalloc.reset_peak()
+        _tracing_questions += 1
+        return tracemalloc.get_traced_memory()[0]
+
+def _stop_tracing(baseline: int) -> int:
+    global _tracing_questions, _tracing_started
+    with _tracing_lock:
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        _tracing_questions -= 1
+        if _tracing_questions == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+        return max(0, peak)
+
+@contextmanager
+def question_resources(task_id: str, track_memory: bool = TRACK_MEMORY):
+    """
+    Account the resources of one question. When it finishes, its workspace is removed and the usage is
+    recorded in the metrics registry (`question.<name>`).
+    """
+    usage = QuestionResources(task_id)
+    baseline = _start_tracing() if track_memory else None
+    token = _current_resources.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_resources.reset(token)
+        if baseline is not None:
+            usage.peak_memory_bytes = _stop_tracing(baseline)
+        usage.cleanup()
+        for name, value in usage.summary().items():
+            if value is not None:
+                metrics.observe(f"question.{name}", value)
+        print(f"Resources of task {task_id}: {usage.summary()}")
+
+# Used outside of a question (e.g. a tool invoked directly): never cleaned up
+_shared_resources = QuestionResources("shared")
+
+def workspace_file(prefix: str = "tmp_", suffix: str = "") -> str:
+    """
+    New empty file in the workspace of the current question.
+    """
+    return (current_resources() or _shared_resources).new_file(prefix, suffix)
+
+def record_download(size: int):
+    usage = current_resources()
+    if usage is not None:
+        usage.record_download(size)
+
+def children_cpu_seconds() -> float:
+    """
+    User and system CPU time of the terminated child processes of this process.
+    """
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def record_subprocess_cpu(seconds: float):
+    usage = current_resources()
+    if usage is not None:
+        usage.record_subprocess_cpu(seconds)
+
+def cap_text(text: str, limit: int, label: str) -> str:
+    """
+    `text` if it has at most `limit` characters, else its first `limit` characters and the handle of the full text.
+    """
+    if len(text) <= limit:
+        return text
+    path = (current_resources() or _shared_resources).spill(text, label)
+    return (f"{text[:limit]}\n\n[Output cut at {limit} of {len(text)} characters. "
+            f"The full output is saved at {path}: read the rest with read_spilled_output]")
+
+def read_spilled(handle: str, offset: int = 0, length: int = TOOL_OUTPUT_LIMIT) -> str:
+    """
+    Up to `length` characters (at most TOOL_OUTPUT_LIMIT) of a workspace file, from `offset`.
+    Raises ValueError if `handle` is not in the workspace, OSError if the file is gone.
+    """
+    path = os.path.realpath(handle)
+    if not path.startswith(os.path.realpath(WORKSPACE_ROOT) + os.sep):
+        raise ValueError(f"Not a spilled output: {handle}")
+    offset, length = max(0, offset), min(length, TOOL_OUTPUT_LIMIT)
+    with open(path, "r", encoding="utf-8") as f:
+        # text files cannot seek to a character offset: skip in bounded chunks
+        while offset > 0:
+            skipped = len(f.read(min(offset, 1 << 16)))
+            if not skipped:
+                break
+            offset -= skipped
+        return f.read(length)
+
+def bounded_output(limit: int = TOOL_OUTPUT_LIMIT) -> Callable:
+    """
+    Decorator capping the text output of a tool function (apply it under @tool).
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            output = fn(*args, **kwargs)
+            return cap_text(output, limit, fn.__name__) if isinstance(output, str) else output
+        return wrapper
+    return decorator
+
+def bound_state(update: dict) -> dict:
+    """
+    Cap the text fields of a state update to STATE_FIELD_LIMITS.
+    """
+    return {
+        key: cap_text(value, STATE_FIELD_LIMITS[key], key) if key in STATE_FIELD_LIMITS and isinstance(value, str) else value
+        for key, value in update.items()
+    }
+
+def bounded_node(node: Callable) -> Callable:
+    """
+    Wrap a graph node so that its state updates are capped with bound_state.
+    """
+    @functools.wraps(node)
+    def wrapper(state):
+        update = node(state)
+        return bound_state(update) if isinstance(update, dict) else update
+    return wrapper
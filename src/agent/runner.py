@@ -0,0 +1,138 @@
+import asyncio
+import os
+import sqlite3
+from typing import Optional
+from .cache import AnswerCache
+from .deadline import Deadline, deadline_scope
+from .graph import build_graph, agent_version, plan_library
+from .hedging import default_policy
+from .llms import STATIC_PREFIX_TOKENS
+from .metrics import metrics
+from .models import AgentState
+from .prompting import PROMPT_CACHE_MIN_TOKENS, cached_token_ratios
+from .resources import question_resources
+
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", os.path.join(".cache", "answers.sqlite"))
+QUESTION_DEADLINE_SECONDS = float(os.getenv("QUESTION_DEADLINE_SECONDS", 600))
+
+def metrics_report() -> str:
+    """
+    Summary of the process metrics: prompt cache use per chain, hedging, and every counter and latency.
+    """
+    lines = ["Prompt cache (static prefix tokens, share of input tokens read from the cache):"]
+    ratios = cached_token_ratios(list(STATIC_PREFIX_TOKENS))
+    for chain, tokens in STATIC_PREFIX_TOKENS.items():
+        note = f" (OpenAI caches no prefix under {PROMPT_CACHE_MIN_TOKENS} tokens)" if tokens < PROMPT_CACHE_MIN_TOKENS else ""
+        lines.append(f"  {chain}: {tokens} tokens, {ratios[chain]:.0%} cached{note}")
+    hedging = default_policy.metrics()
+    if hedging:
+        lines.append("Hedging:")
+        for model, values in hedging.items():
+            lines.append(f"  {model}: {values['hedges_fired']}/{values['calls']} calls hedged, "
+                         f"{values['hedges_won']} won, {values['hedges_skipped']} skipped, delay {values['hedge_delay']:.1f}s")
+    summary = metrics.summary()
+    if summary:
+        lines.append("Metrics:")
+        for name, values in sorted(summary.items()):
+            lines.append(f"  {name}: " + ", ".join(
+                f"{key}={value:.3g}" if isinstance(value, float) else f"{key}={value}" for key, value in values.items()))
+    return "\n".join(lines)
+
+class SmartyAgent:
+    def __init__(self, use_cache: bool = True, draw_graph: bool = True):
+        print("Agent initialized.")
+        self.agent = build_graph(draw=draw_graph)
+        self.cache = AnswerCache(ANSWER_CACHE_PATH, agent_version()) if use_cache else None
+
+    def _lookup(self, question: str, task_id: Optional[str], file_name: Optional[str]):
+        """
+        Returns (cached answer or None, question to send to the graph).
+        """
+        if not self.cache:
+            return None, question
+        hit = self.cache.get(question, task_id, file_name)
+        if hit:
+            print(f"Answer cache hit for task {task_id}")
+            return hit['answer'], question
+        similar = self.cache.get_similar(question, task_id, file_name)
+        if similar and similar['verified']:
+            print(f"Answer cache near-duplicate hit for task {task_id} (similarity {similar['similarity']:.2f})")
+            return similar['answer'], question
+        if similar:
+            # unverified near-duplicate: seed the run with the earlier answer instead of serving it
+            return None, f"{question}\n\n(Hint: a very similar question was previously answered with: {similar['answer']})"
+        return None, question
+
+    def _store(self, question: str, task_id: Optional[str], answer: str, file_name: Optional[str]):
+        # the cache file can be shared by many workers: a locked database must not fail an answered question
+        try:
+            self.cache.put(question, task_id, answer, file_name=file_name)
+        except sqlite3.Error as e:
+            print(f"Could not cache the answer to task {task_id}: {e}")
+
+    def mark_verified(self, task_id: str):
+        """
+        Record that the answer to `task_id` was verified correct: it can be served for near-duplicates,
+        and its plan joins the plan library.
+        """
+        if self.cache:
+            self.cache.mark_verified(task_id)
+        plan_library.verify(task_id)
+
+    # __call__ turns an instance of SmartyAgent into a callable object
+    def __call__(self, question: str, task_id: Optional[str], deadline_seconds: float = QUESTION_DEADLINE_SECONDS,
+                 file_name: Optional[str] = None) -> str:
+        """
+        Answer a question. `file_name` is the name of its attachment ('' for none), None if unknown.
+        """
+        print(f"Agent received question (first 50 chars): {question[:50]}...")
+        cached, graph_question = self._lookup(question, task_id, file_name)
+        if cached is not None:
+            return cached
+        # every node, model call, tool and subprocess of this run honors the deadline; its resources are
+        # accounted and its workspace is removed when it finishes
+        with deadline_scope(Deadline(deadline_seconds)), question_resources(task_id):
+            response = self.agent.invoke(AgentState({'question': graph_question, 'task_id': task_id or '',
+                                                     'file_name': file_name if task_id else '', 'iterations': 0}))
+        # answers forced by the deadline or the iteration limit are not cached: the next run gets another chance
+        if self.cache and not response.get('forced_answer'):
+            self._store(question, task_id, response['answer'], file_name)
+        return response['answer']
+
+    async def astream(self, question: str, task_id: Optional[str] = None, deadline_seconds: float = QUESTION_DEADLINE_SECONDS,
+                      file_name: Optional[str] = None):
+        """
+        Run the graph and yield its `astream_events` (v2) as they happen. Ad-hoc questions have no task_id.
+        The last event is the end of the root run, with the final state as output.
+        """
+        print(f"Agent streaming question (first 50 chars): {question[:50]}...")
+        cached, graph_question = self._lookup(question, task_id, file_name)
+        if cached is not None:
+            yield {"event": "on_chain_end", "name": "cache", "parent_ids": [], "data": {"output": {"answer": cached}}}
+            return
+
+        queue = asyncio.Queue()
+        done = object()
+
+        async def pump():
+            # the deadline scope lives inside this task, so it is set and reset in the same context
+            try:
+                with deadline_scope(Deadline(deadline_seconds)), question_resources(task_id):
+                    state = AgentState({'question': graph_question, 'task_id': task_id or '',
+                                        'file_name': file_name if task_id else '', 'iterations': 0})
+                    async for event in self.agent.astream_events(state, version="v2"):
+                        await queue.put(event)
+            finally:
+                await queue.put(done)
+
+        task = asyncio.create_task(pump())
+        try:
+            while (event := await queue.get()) is not done:
+                if event["event"] == "on_chain_end" and not event.get("parent_ids") and self.cache:
+                    output = event["data"]["output"]
+                    if not output.get("forced_answer"):
+                        self._store(question, task_id, output["answer"], file_name)
+                yield event
+            await task
+        finally:
+            task.cancel()
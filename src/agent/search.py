@@ -0,0 +1,62 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+
+# Reciprocal rank fusion constant: dampens the weight of the top ranks of each result list
+RRF_K = 60
+_TRACKING_PARAMS = {
+    "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content", "utm_id",
+    "fbclid", "gclid", "msclkid", "ref", "ref_src", "mc_cid", "mc_eid",
+}
+
+def canonical_url(url: str) -> str:
+    """
+    Canonical form of a URL for deduplication: lowercase host without www./mobile prefix, percent-decoded
+    path, no fragment, no tracking parameters, no trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    host = host.replace(".m.wikipedia.org", ".wikipedia.org")
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if k.lower() not in _TRACKING_PARAMS))
+    path = unquote(parts.path).rstrip("/") or "/"
+    return urlunsplit(("https", host, path, query, ""))
+
+def fuse_results(result_lists: List[List[dict]], limit: int) -> List[dict]:
+    """
+    Merge ranked result lists ({"url", "title", "content"}) with reciprocal rank fusion, deduplicated by canonical URL.
+    """
+    fused: Dict[str, dict] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results, 1):
+            if not result.get("url"):
+                continue
+            key = canonical_url(result["url"])
+            entry = fused.setdefault(key, {"url": result["url"], "title": result.get("title", ""), "content": "", "score": 0.0, "hits": 0})
+            entry["score"] += 1.0 / (RRF_K + rank)
+            entry["hits"] += 1
+            # keep the longest snippet seen for the page
+            if len(result.get("content") or "") > len(entry["content"]):
+                entry["content"] = result["content"]
+    ranked = sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)[:limit]
+    for entry in ranked:
+        entry["score"] = round(entry["score"], 4)
+    return ranked
+
+def fan_out(searches: List[Callable[[], List[dict]]], max_workers: int = 8) -> List[List[dict]]:
+    """
+    Run the search callables concurrently. A failing search contributes an empty list.
+    """
+    def safe(search):
+        try:
+            return search()
+        except Exception as e:
+            print(f"Search failed: {e}")
+            return []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search") as executor:
+        # one context copy per task: the question deadline applies to every search
+        futures = [executor.submit(contextvars.copy_context().run, safe, search) for search in searches]
+        return [future.result() for future in futures]
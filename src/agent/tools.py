@@ -1,10 +1,12 @@
+import ast
 import os
+import csv
+import math
 import requests
 import urllib.request
-import tempfile
-from typing import Annotated
+from decimal import Decimal, DivisionByZero, ROUND_HALF_UP, localcontext as decimal_context
+from typing import Annotated, List, Optional
 from langchain_community.tools import tool
-from langchain_community.utilities import WikipediaAPIWrapper
 from langchain_tavily import TavilySearch
 import json
 from groq import Groq
@@ -12,19 +14,67 @@ import base64
 from openai import OpenAI
 import subprocess
 import sys
+import numpy as np
 import pandas as pd
 import openpyxl
 import google.generativeai as genai
 from dotenv import load_dotenv
 import operator
+from .deadline import check_deadline, remaining_timeout
+from .resources import (TOOL_OUTPUT_LIMIT, bounded_output, children_cpu_seconds, read_spilled,
+                        record_download, record_subprocess_cpu, workspace_file)
+from .wiki import WikipediaClient
+from .search import fan_out, fuse_results
 
 load_dotenv()
 
+FILES_URL = "https://agents-course-unit4-scoring.hf.space/files"
+
+# Shared client: section and revision lookups are cached across tool calls
+wikipedia_client = WikipediaClient()
+
+# Map common content types to extensions
+CONTENT_TYPE_MAP = {
+    'application/pdf': '.pdf',
+    'image/jpeg': '.jpg',
+    'image/jpg': '.jpg', 
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'audio/mpeg': '.mp3',
+    'audio/mp3': '.mp3',
+    'audio/wav': '.wav',
+    'audio/ogg': '.ogg',
+    'video/mp4': '.mp4',
+    'video/webm': '.webm',
+    'video/avi': '.avi',
+    'text/plain': '.txt',
+    'text/csv': '.csv',
+    'application/json': '.json',
+    'application/xml': '.xml',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': '.xlsx',
+    'application/vnd.ms-excel': '.xls',
+    'application/msword': '.doc',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': '.docx',
+    'application/zip': '.zip',
+    'application/x-zip-compressed': '.zip',
+}
+
+def extension_for_content_type(content_type: str) -> str:
+    """
+    Returns the file extension for a content-type header, or '' if unknown.
+    """
+    content_type = (content_type or '').lower()
+    for ct, ext in CONTENT_TYPE_MAP.items():
+        if ct in content_type:
+            return ext
+    return ''
+
 # Add tool to download a file from a url and save it to a local path in a temporary file
 @tool
 def download_file_tool(task_id: str) -> str:
     """
-    Downloads a file from the web and stores it in a temporary file. Returns the absolute path for the file
+    Downloads a file from the web and stores it in the workspace of the question. Returns the absolute path for the file
     Args:
       task_id (str): the task_id of the file to download.
     Returns:
@@ -32,48 +82,16 @@ def download_file_tool(task_id: str) -> str:
     """
 
     # Build the URL and make a GET request to determine content-type
-    url = f"https://agents-course-unit4-scoring.hf.space/files/{task_id}"
-    
-    # Map common content types to extensions
-    content_type_map = {
-        'application/pdf': '.pdf',
-        'image/jpeg': '.jpg',
-        'image/jpg': '.jpg', 
-        'image/png': '.png',
-        'image/gif': '.gif',
-        'image/webp': '.webp',
-        'audio/mpeg': '.mp3',
-        'audio/mp3': '.mp3',
-        'audio/wav': '.wav',
-        'audio/ogg': '.ogg',
-        'video/mp4': '.mp4',
-        'video/webm': '.webm',
-        'video/avi': '.avi',
-        'text/plain': '.txt',
-        'text/csv': '.csv',
-        'application/json': '.json',
-        'application/xml': '.xml',
-        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': '.xlsx',
-        'application/vnd.ms-excel': '.xls',
-        'application/msword': '.doc',
-        'application/vnd.openxmlformats-officedocument.wordprocessingml.document': '.docx',
-        'application/zip': '.zip',
-        'application/x-zip-compressed': '.zip',
-    }
-    
+    url = f"{FILES_URL}/{task_id}"
+
+    timeout = remaining_timeout(60)
     try:
         # Make GET request to get content-type and download the file
-        response = requests.get(url, allow_redirects=True)
+        response = requests.get(url, stream=True, allow_redirects=True, timeout=timeout)
         response.raise_for_status()
         
-        content_type = response.headers.get('content-type', '').lower()
-        
         # Try to get extension from content-type
-        extension = ''
-        for ct, ext in content_type_map.items():
-            if ct in content_type:
-                extension = ext
-                break
+        extension = extension_for_content_type(response.headers.get('content-type', ''))
         
         # Create base filename from task_id
         base_name = task_id
@@ -84,45 +102,111 @@ def download_file_tool(task_id: str) -> str:
         base_name = 'download'
         response = None
 
-    # Create temporary file with detected extension
-    temp_file = tempfile.NamedTemporaryFile(
-        delete=False,
-        prefix=f'tmp_{base_name}_',
-        suffix=extension
-    )
-    temp_file_path = temp_file.name
-    temp_file.close()
+    # Create a file with detected extension in the workspace, removed when the question finishes
+    temp_file_path = workspace_file(prefix=f'tmp_{base_name}_', suffix=extension)
 
     # Save the file content
     if response is not None:
-        # We already have the content from the GET request above
-        with open(temp_file_path, 'wb') as f:
-            f.write(response.content)
+        # Stream the body of the GET request above to disk
+        with response, open(temp_file_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=1 << 16):
+                f.write(chunk)
     else:
         # Fallback: use urllib if the requests approach failed
         urllib.request.urlretrieve(url, temp_file_path)
+    record_download(os.path.getsize(temp_file_path))
 
     print(f"Downloaded file to: {temp_file_path}")
 
     return temp_file_path
 
 @tool
+@bounded_output()
 def wikipedia_search_tool(
   query: Annotated[str, 'The query to search Wikipedia for']
 ) -> str:
-  "Perform a search on Wikipedia"
+  "Perform a search on Wikipedia. Returns the top pages with their revision, section headings and introduction"
   print(f">>>>> Searching Wikipedia for: {query}")
-  return WikipediaAPIWrapper().run(query)
+  check_deadline()
+  try:
+    titles = wikipedia_client.search(query, limit=3)
+    if not titles:
+      return "No good Wikipedia Search Result was found"
+    return json.dumps(wikipedia_client.page_overviews(titles), indent=2, ensure_ascii=False)
+  except (requests.RequestException, ValueError) as e:
+    return f"Wikipedia search failed: {e}. Retry later or use another search tool."
 
 @tool
+@bounded_output()
+def wikipedia_page_tool(
+  title: Annotated[str, 'The exact title of the Wikipedia page'],
+  section: Annotated[Optional[str], 'The heading of the section to read; omit to list the sections'] = None,
+  as_of: Annotated[Optional[str], 'Read the latest revision at the end of this date: YYYY, YYYY-MM or YYYY-MM-DD'] = None,
+  revision_id: Annotated[Optional[int], 'Read this exact revision id'] = None,
+) -> str:
+  """Read a Wikipedia page section by section, optionally pinned to a revision or a date (e.g. "the latest 2022 version").
+  Returns the section text and its tables as lists of rows."""
+  print(f">>>>> Reading Wikipedia page: {title} (section: {section}, as_of: {as_of}, revision: {revision_id})")
+  check_deadline()
+  try:
+    if revision_id is None:
+      revision = wikipedia_client.revision(title, as_of)
+      if revision is None:
+        return f"No Wikipedia page or revision found for '{title}'" + (f" as of {as_of}" if as_of else "")
+    else:
+      revision = {"title": title, "revision_id": revision_id}
+    sections = wikipedia_client.sections(revision["revision_id"])
+    if section is None:
+      return json.dumps({**revision, "sections": [s["heading"] for s in sections]}, indent=2, ensure_ascii=False)
+    match = wikipedia_client.find_section(revision["revision_id"], section)
+    if match is None:
+      return f"No section '{section}' in '{revision['title']}'. Sections: {[s['heading'] for s in sections]}"
+    content = wikipedia_client.section(revision["revision_id"], match["index"])
+    return json.dumps({**revision, "section": match["heading"], "text": content["text"][:8000], "tables": content["tables"]},
+                      indent=2, ensure_ascii=False)
+  except ValueError as e:
+    # unrecognized date, or an API error such as an unknown revision id
+    return f"Could not read the Wikipedia page '{title}': {e}"
+  except requests.RequestException as e:
+    return f"Wikipedia request failed: {e}. Retry later or use another source."
+
+@tool
+@bounded_output()
 def tavily_search_tool(
   query: Annotated[str, 'The query to search Tavily for']
 ) -> str:
   "Perform a search on Tavily"
   print(f">>>>> Searching Tavily for: {query}")
+  check_deadline()
   return TavilySearch(max_results=3).run(query)
 
 @tool
+@bounded_output()
+def multi_search_tool(
+  queries: Annotated[List[str], 'Several phrasings of the same search, e.g. 2 to 5 query variants'],
+  max_results: Annotated[int, 'Maximum number of merged results to return'] = 8,
+) -> str:
+  """Search Tavily and Wikipedia with several query variants at once.
+  Returns one ranked list of results, deduplicated by URL. Prefer this over repeated single searches."""
+  print(f">>>>> Multi-search for: {queries}")
+  check_deadline()
+  searches = []
+  for query in queries[:8]:
+    searches.append(lambda query=query: _tavily_results(query))
+    searches.append(lambda query=query: wikipedia_client.search_results(query, limit=3))
+  results = fuse_results(fan_out(searches), max_results)
+  for result in results:
+    result["content"] = result["content"][:500]
+  return json.dumps(results, indent=2, ensure_ascii=False)
+
+def _tavily_results(query: str) -> List[dict]:
+  response = TavilySearch(max_results=5).invoke({"query": query})
+  if isinstance(response, str):
+    response = json.loads(response)
+  return [{"url": r.get("url"), "title": r.get("title", ""), "content": r.get("content", "")} for r in response.get("results", [])]
+
+@tool
+@bounded_output()
 def audio_2_text(file_path: str) -> str:
     """
     transcribe an audio file to text
@@ -131,7 +215,7 @@ def audio_2_text(file_path: str) -> str:
     """
 
     # Initialize the Groq client
-    client = Groq()
+    client = Groq(timeout=remaining_timeout(120))
 
     # Open the audio file
     with open(file_path, "rb") as file:
@@ -161,6 +245,7 @@ def encode_image(image_path: str) -> str:
         return base64.b64encode(image_file.read()).decode('utf-8')
 
 @tool
+@bounded_output()
 def read_image(image_path: str) -> str:
     """
     Read an image and return the text description.
@@ -169,7 +254,7 @@ def read_image(image_path: str) -> str:
     """
     base64_image = encode_image(image_path)
 
-    client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+    client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"), timeout=remaining_timeout(120))
 
     chat_completion = client.chat.completions.create(
         messages=[
@@ -195,9 +280,12 @@ def read_image(image_path: str) -> str:
 def code_executor(code: str, timeout: int = 100) -> dict:
     """
     Executes Python code in a subprocess and returns the result.
+    The timeout is capped by the time left before the question deadline.
     """
     result = {"stdout": "", "stderr": "", "exit_code": 0}
     try:
+        timeout = remaining_timeout(timeout)
+        cpu_before = children_cpu_seconds()
         process = subprocess.run(
             [sys.executable, "-c", code],
             capture_output=True,
@@ -210,6 +298,7 @@ def code_executor(code: str, timeout: int = 100) -> dict:
             "stderr": process.stderr,
             "exit_code": process.returncode,
         })
+        record_subprocess_cpu(children_cpu_seconds() - cpu_before)
     except subprocess.TimeoutExpired:
         result["stderr"] = "Execution timed out."
     except Exception as e:
@@ -217,6 +306,7 @@ def code_executor(code: str, timeout: int = 100) -> dict:
     return result
 
 @tool
+@bounded_output()
 def execute_code_from_file(file_path: str, timeout: int = 10) -> dict:
     """
     Reads Python code from a file and executes it in a subprocess.
@@ -238,90 +328,274 @@ def execute_code_from_file(file_path: str, timeout: int = 10) -> dict:
     except Exception as e:
         return {"stdout": "", "stderr": f"Error reading file: {str(e)}", "exit_code": 1}
 
+def _excel_rows(file_path: str):
+    """
+    Rows of the first sheet of an Excel file. .xlsx files are streamed row by row, without loading the whole workbook.
+    """
+    if file_path.lower().endswith(('.xlsx', '.xlsm')):
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for row in workbook.worksheets[0].iter_rows(values_only=True):
+                if any(cell is not None for cell in row):
+                    yield ['' if cell is None else cell for cell in row]
+        finally:
+            workbook.close()
+    else:
+        df = pd.read_excel(file_path)
+        yield list(df.columns)
+        for row in df.itertuples(index=False, name=None):
+            yield ['' if pd.isna(cell) else cell for cell in row]
+
 @tool
 def read_excel_file(file_path: str) -> str:
     """
-    Read an Excel file and return a CSV string.
+    Read an Excel file and return a CSV string. For large sheets, only the first rows are returned,
+    with the path of the full CSV file.
     Args:
       file_path (str): the absolute file_path of the targeted Excel file.
     """
-    # Read the Excel file
-    df = pd.read_excel(file_path)
-    
-    # Return the text description
-    return df.to_csv(index=False)
+    # Convert the sheet to a CSV file in the workspace
+    csv_path = workspace_file(prefix='sheet_', suffix='.csv')
+    rows = 0
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        for row in _excel_rows(file_path):
+            writer.writerow(row)
+            rows += 1
+
+    # Return the CSV, or its first rows if it is too large
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        text = f.read(TOOL_OUTPUT_LIMIT + 1)
+    if len(text) <= TOOL_OUTPUT_LIMIT:
+        return text
+    head = text[:text.rfind('\n', 0, TOOL_OUTPUT_LIMIT) + 1]
+    shown = head.count('\n')
+    return (f"{head}\n[Sheet of {rows} rows (header included), only the first {shown} are shown. "
+            f"The full CSV is saved at {csv_path}: read the rest with read_spilled_output, or load it in code]")
+
+@tool
+def read_spilled_output(
+  handle: Annotated[str, 'The path of the saved output, given where the output was cut'],
+  offset: Annotated[int, 'The character to start reading at'] = 0,
+  length: Annotated[int, 'The number of characters to read'] = TOOL_OUTPUT_LIMIT,
+) -> str:
+  "Read the rest of a tool output or sheet that was too large and saved to a file"
+  check_deadline()
+  try:
+    return read_spilled(handle, offset, length) or "End of the saved output."
+  except (ValueError, OSError) as e:
+    # a mistyped or truncated handle, or the workspace of a finished question
+    return f"Could not read the saved output: {e}. Copy the exact path given where the output was cut."
+
+# Safe operators mapping for the expression evaluator
+_binary_operators = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+_unary_operators = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+_comparison_operators = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+def _aggregate(reduce):
+    """Aggregate over a list, or over all the arguments when there are several: max(3, 5), sum(a, [1, 2])."""
+    def aggregate(*arguments):
+        if len(arguments) == 1:
+            return reduce(arguments[0])
+        return reduce(np.concatenate([np.ravel(argument) for argument in arguments]))
+    return aggregate
+
+# Vectorized functions available in expressions (NumPy-backed, elementwise on lists)
+_functions = {
+    'sum': _aggregate(np.sum),
+    'mean': _aggregate(np.mean),
+    'median': _aggregate(np.median),
+    'min': _aggregate(np.min),
+    'max': _aggregate(np.max),
+    'std': _aggregate(np.std),
+    'prod': _aggregate(np.prod),
+    'cumsum': np.cumsum,
+    'abs': np.abs,
+    'sqrt': np.sqrt,
+    'log': np.log,
+    'exp': np.exp,
+    'round': np.round,
+    'len': len,
+    'percent': lambda part, whole: part * 100 / whole,
+    'pct_change': lambda old, new: (new - old) * 100 / old,
+}
+# Units results can be expressed in before rounding
+_units = {
+    'thousand': 10**3,
+    'million': 10**6,
+    'billion': 10**9,
+}
+_MAX_EXPRESSION_LENGTH = 10_000
+_MAX_EXPONENT = 1_000
+# Bits of the largest power result (about 3000 decimal digits)
+_MAX_RESULT_BITS = 10_000
+
+def _magnitude_bits(value) -> float:
+    """Bits of the integer part of the largest element of a number or array."""
+    if isinstance(value, np.ndarray):
+        return max((_magnitude_bits(v) for v in value.ravel().tolist()), default=0)
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, int):
+        return abs(value).bit_length()
+    if isinstance(value, Decimal):
+        return 0 if not value.is_finite() or value.is_zero() else max(0, value.adjusted() + 1) * math.log2(10)
+    if isinstance(value, float):
+        return 0 if not math.isfinite(value) else max(0, math.frexp(value)[1])
+    return 0
+
+def _check_power(base, exponent):
+    """Reject powers with a huge exponent or result before computing them."""
+    if _magnitude_bits(exponent) > _MAX_EXPONENT.bit_length():
+        raise ValueError(f"Exponent too large (max {_MAX_EXPONENT})")
+    largest = float(np.max(np.abs(np.asarray(exponent, dtype=float)))) if np.size(exponent) else 0.0
+    if largest > _MAX_EXPONENT:
+        raise ValueError(f"Exponent too large (max {_MAX_EXPONENT})")
+    if _magnitude_bits(base) * largest > _MAX_RESULT_BITS:
+        raise ValueError(f"Result too large (max {_MAX_RESULT_BITS} bits)")
+
+def _check_finite(value):
+    """Reject results that overflowed to infinity or are not a number."""
+    for element in (value.ravel().tolist() if isinstance(value, np.ndarray) else [value]):
+        if isinstance(element, np.generic):
+            element = element.item()
+        if isinstance(element, Decimal) and not element.is_finite():
+            raise ValueError("Result is not a finite number")
+        if isinstance(element, float) and not math.isfinite(element):
+            raise ValueError("Result is not a finite number")
+
+def _evaluate_node(node, variables: dict, exact: bool):
+    if isinstance(node, ast.Expression):
+        return _evaluate_node(node.body, variables, exact)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return Decimal(str(node.value)) if exact else node.value
+    if isinstance(node, (ast.List, ast.Tuple)):
+        values = [_evaluate_node(element, variables, exact) for element in node.elts]
+        return np.array(values, dtype=object if exact else float)
+    if isinstance(node, ast.Name):
+        if node.id not in variables:
+            raise ValueError(f"Unknown name: {node.id}")
+        return variables[node.id]
+    if isinstance(node, ast.BinOp) and type(node.op) in _binary_operators:
+        left = _evaluate_node(node.left, variables, exact)
+        right = _evaluate_node(node.right, variables, exact)
+        if isinstance(node.op, ast.Pow):
+            _check_power(left, right)
+        return _binary_operators[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _unary_operators:
+        return _unary_operators[type(node.op)](_evaluate_node(node.operand, variables, exact))
+    if isinstance(node, ast.Compare):
+        left = _evaluate_node(node.left, variables, exact)
+        result = True
+        for op, comparator in zip(node.ops, node.comparators):
+            if type(op) not in _comparison_operators:
+                raise ValueError(f"Unsupported comparison: {type(op).__name__}")
+            right = _evaluate_node(comparator, variables, exact)
+            result = np.logical_and(result, _comparison_operators[type(op)](left, right))
+            left = right
+        return result
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _functions and not node.keywords:
+        arguments = [_evaluate_node(argument, variables, exact) for argument in node.args]
+        return _functions[node.func.id](*arguments)
+    raise ValueError(f"Unsupported expression element: {ast.dump(node)[:80]}")
+
+def _to_number(value, exact: bool):
+    """Convert a variable value (number, numeric string or list of them) to a number or array."""
+    if isinstance(value, (list, tuple)):
+        return np.array([_to_number(v, exact) for v in value], dtype=object if exact else float)
+    if isinstance(value, bool):
+        raise ValueError("Booleans are not numbers")
+    if isinstance(value, str):
+        value = value.replace(',', '').strip()
+    return Decimal(str(value)) if exact else float(value)
+
+def _format_result(value, decimals, exact: bool):
+    if isinstance(value, np.ndarray):
+        return [_format_result(v, decimals, exact) for v in value.tolist()]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, Decimal):
+        if decimals is not None:
+            value = value.quantize(Decimal(1).scaleb(-decimals), rounding=ROUND_HALF_UP)
+        return value
+    if decimals is not None:
+        value = float(Decimal(str(value)).quantize(Decimal(1).scaleb(-decimals), rounding=ROUND_HALF_UP))
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
 
 @tool
-def calculator(term1: str, term2: str, operation: str) -> str:
+def calculator(
+    expression: str,
+    variables: Optional[dict] = None,
+    decimals: Optional[int] = None,
+    unit: Optional[str] = None,
+    exact: bool = False,
+) -> str:
     """
-    Calculate the result of a mathematical operation between two terms.
-    
+    Evaluate a full arithmetic expression in one call, including numeric lists and vectorized aggregates.
+
     Args:
-      term1 (str): the first term (must be a valid number).
-      term2 (str): the second term (must be a valid number).
-      operation (str): the operation to perform. Supported operations:
-        - '+' : addition
-        - '-' : subtraction
-        - '*' : multiplication
-        - '/' : division
-        - '//' : floor division
-        - '%' : modulo
-        - '**' : exponentiation
-        - '==' : equality comparison
-        - '!=' : inequality comparison
-        - '<' : less than
-        - '<=' : less than or equal
-        - '>' : greater than
-        - '>=' : greater than or equal
-    
+      expression (str): the expression, e.g. "(a + b) * c / d", "sum([1.5, 2, 3])", "mean(prices) * 1.1",
+        "percent(sum(food), sum(food) + sum(drinks))", "sum(prices * quantities)", "x > 10".
+        Supported: numbers, lists [..], + - * / // % **, comparisons, and the functions
+        sum, mean, median, min, max, std, prod, cumsum, abs, sqrt, log, exp, round, len,
+        percent(part, whole), pct_change(old, new). Arithmetic on lists is elementwise.
+      variables (dict): optional named values used in the expression: numbers, numeric strings or lists,
+        e.g. {"prices": [1.5, 2.0], "tax": "0.07"}.
+      decimals (int): optional number of decimals to round the result to (half up).
+      unit (str): optional unit to express the result in before rounding: 'thousand', 'million', 'billion'.
+      exact (bool): compute with exact decimals instead of floating point (e.g. for money).
+
     Returns:
-      str: the result of the operation as a string.
-    
-    Raises:
-      ValueError: if the operation is not supported or if terms are not valid numbers.
+      str: the result (a number, a boolean or a JSON list), or an error message starting with "Error:"
+        if the expression is invalid, uses unsupported elements or has no finite result.
     """
-    # Safe operators mapping
-    safe_operators = {
-        '+': operator.add,
-        '-': operator.sub,
-        '*': operator.mul,
-        '/': operator.truediv,
-        '//': operator.floordiv,
-        '%': operator.mod,
-        '**': operator.pow,
-        '==': operator.eq,
-        '!=': operator.ne,
-        '<': operator.lt,
-        '<=': operator.le,
-        '>': operator.gt,
-        '>=': operator.ge,
-    }
-    
-    if operation not in safe_operators:
-        raise ValueError(f"Unsupported operation: {operation}. Supported operations: {list(safe_operators.keys())}")
-    
+    if len(expression) > _MAX_EXPRESSION_LENGTH:
+        return f"Error: expression too long (max {_MAX_EXPRESSION_LENGTH} characters)"
+    if unit is not None and unit not in _units:
+        return f"Error: unsupported unit: {unit}. Supported units: {list(_units.keys())}"
     try:
-        # Convert terms to float for arithmetic operations
-        num1 = float(term1)
-        num2 = float(term2)
-        
-        # Perform the operation
-        result = safe_operators[operation](num1, num2)
-        
-        # Return as string, preserving integer format for whole numbers
-        if isinstance(result, float) and result.is_integer():
-            return str(int(result))
-        else:
-            return str(result)
-            
+        names = {name: _to_number(value, exact) for name, value in (variables or {}).items()}
+        with decimal_context() as context:
+            context.prec = 50
+            with np.errstate(all='raise'):
+                result = _evaluate_node(ast.parse(expression, mode='eval'), names, exact)
+                if unit is not None:
+                    result = result / (Decimal(_units[unit]) if exact else _units[unit])
+            _check_finite(result)
+        result = _format_result(result, decimals, exact)
+        output = json.dumps(result, default=str) if isinstance(result, list) else str(result)
     except ValueError as e:
-        raise ValueError(f"Invalid numeric terms: term1='{term1}', term2='{term2}'. Error: {e}")
-    except ZeroDivisionError:
-        raise ValueError("Division by zero is not allowed")
+        return f"Error: invalid expression '{expression}': {e}"
+    except (ZeroDivisionError, DivisionByZero):
+        return "Error: division by zero is not allowed"
+    except FloatingPointError as e:
+        return f"Error: calculation error: {e}"
     except Exception as e:
-        raise ValueError(f"Calculation error: {e}")
+        return f"Error: calculation error: {e}"
+    return output
 
 @tool
+@bounded_output()
 def query_video(video_url: str, query: str) -> str:
     """
     Query a video and return the answer to a question.
@@ -350,6 +624,6 @@ def query_video(video_url: str, query: str) -> str:
                 }
             ]
         }
-    ])
+    ], request_options={"timeout": remaining_timeout(300)})
 
     return response.text
\ No newline at end of file
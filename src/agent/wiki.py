@@ -0,0 +1,213 @@
+import calendar
+import contextvars
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+import requests
+from .deadline import remaining_timeout
+
+WIKIPEDIA_API_URL = os.getenv("WIKIPEDIA_API_URL", "https://en.wikipedia.org/w/api.php")
+
+class _SectionParser(HTMLParser):
+    """
+    Splits rendered section HTML into plain text and tables (lists of rows of cell texts).
+    """
+    _SKIPPED = {"style", "script", "sup"}
+
+    def __init__(self):
+        super().__init__()
+        self.text: List[str] = []
+        self.tables: List[List[List[str]]] = []
+        self._tables_stack: List[List[List[str]]] = []
+        self._cell: Optional[List[str]] = None
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIPPED:
+            self._skip += 1
+        elif tag == "table":
+            self._tables_stack.append([])
+        elif tag == "tr" and self._tables_stack:
+            self._tables_stack[-1].append([])
+        elif tag in ("td", "th") and self._tables_stack:
+            self._cell = []
+        elif tag in ("p", "br", "li", "h2", "h3", "h4") and not self._tables_stack:
+            self.text.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIPPED:
+            self._skip = max(0, self._skip - 1)
+        elif tag == "table" and self._tables_stack:
+            table = [row for row in self._tables_stack.pop() if row]
+            if table:
+                self.tables.append(table)
+        elif tag in ("td", "th") and self._cell is not None and self._tables_stack:
+            rows = self._tables_stack[-1]
+            if not rows:
+                rows.append([])
+            rows[-1].append(" ".join("".join(self._cell).split()))
+            self._cell = None
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self._cell is not None:
+            self._cell.append(data)
+        elif not self._tables_stack:
+            self.text.append(data)
+
+    def result(self) -> dict:
+        text = re.sub(r"\n\s*\n+", "\n\n", "".join(self.text)).strip()
+        return {"text": text, "tables": self.tables}
+
+_AS_OF_DATE = re.compile(r"(?<!\d)(\d{4})(?:[-/.](\d{1,2})(?:[-/.](\d{1,2}))?)?(?!\d)")
+_MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+_MONTHS.update({name.lower(): number for number, name in enumerate(calendar.month_abbr) if name})
+
+def _as_of_timestamp(as_of: str) -> str:
+    """
+    End of the given period as a MediaWiki timestamp: '2022' -> 2022-12-31T23:59:59Z, '2022-06' -> 2022-06-30T23:59:59Z.
+    Surrounding words and month names are tolerated ('end of 2022', 'June 2022'); raises ValueError otherwise.
+    """
+    match = _AS_OF_DATE.search(as_of or "")
+    if match is None:
+        raise ValueError(f"Unrecognized date '{as_of}': use YYYY, YYYY-MM or YYYY-MM-DD")
+    year = int(match.group(1))
+    month = match.group(2)
+    if month is None:
+        month = next((number for word in re.findall(r"[a-z]+", as_of.lower()) if (number := _MONTHS.get(word))), 12)
+    month = int(month)
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid month in date '{as_of}': use YYYY, YYYY-MM or YYYY-MM-DD")
+    last_day = calendar.monthrange(year, month)[1]
+    day = int(match.group(3)) if match.group(3) else last_day
+    if not 1 <= day <= last_day:
+        raise ValueError(f"Invalid day in date '{as_of}': use YYYY, YYYY-MM or YYYY-MM-DD")
+    return f"{year:04d}-{month:02d}-{day:02d}T23:59:59Z"
+
+class WikipediaClient:
+    """
+    Minimal MediaWiki API client: search, revision pinning (by id or date), lazy section loading and
+    structured tables. Pages are fetched concurrently. `api_url` can point to a local stand-in of the API.
+    """
+
+    def __init__(self, api_url: str = WIKIPEDIA_API_URL, session: Optional[requests.Session] = None, max_workers: int = 4):
+        self.api_url = api_url
+        self.session = session or requests.Session()
+        self.session.headers.setdefault("User-Agent", "Agent-GAIA-Benchmark/1.0")
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="wikipedia")
+        self._lock = threading.Lock()
+        # revision id -> sections, and (revision id, section index) -> parsed section
+        self._sections: Dict[int, List[dict]] = {}
+        self._section_content: Dict[tuple, dict] = {}
+
+    def _get(self, **params) -> dict:
+        params.update({"format": "json", "formatversion": 2})
+        response = self.session.get(self.api_url, params=params, timeout=remaining_timeout(30))
+        response.raise_for_status()
+        data = response.json()
+        if "error" in data:
+            raise ValueError(f"MediaWiki API error: {data['error'].get('info', data['error'])}")
+        return data
+
+    def search(self, query: str, limit: int = 3) -> List[str]:
+        return [hit["title"] for hit in self.search_results(query, limit)]
+
+    def search_results(self, query: str, limit: int = 3) -> List[dict]:
+        """
+        Search hits with their page URL and a plain text snippet.
+        """
+        data = self._get(action="query", list="search", srsearch=query, srlimit=limit, srprop="snippet")
+        return [
+            {
+                "title": hit["title"],
+                "url": f"https://en.wikipedia.org/wiki/{hit['title'].replace(' ', '_')}",
+                "content": re.sub(r"<[^>]+>", "", hit.get("snippet", "")),
+            }
+            for hit in data.get("query", {}).get("search", [])
+        ]
+
+    def revision(self, title: str, as_of: Optional[str] = None) -> Optional[dict]:
+        """
+        Latest revision of `title`, or the latest one at the end of `as_of` (YYYY, YYYY-MM or YYYY-MM-DD).
+        """
+        params = {"action": "query", "prop": "revisions", "titles": title, "rvlimit": 1,
+                  "rvprop": "ids|timestamp", "redirects": 1}
+        if as_of:
+            params.update({"rvstart": _as_of_timestamp(as_of), "rvdir": "older"})
+        pages = self._get(**params).get("query", {}).get("pages", [])
+        if not pages or not pages[0].get("revisions"):
+            return None
+        revision = pages[0]["revisions"][0]
+        return {"title": pages[0]["title"], "revision_id": revision["revid"], "timestamp": revision["timestamp"]}
+
+    def sections(self, revision_id: int) -> List[dict]:
+        with self._lock:
+            if revision_id in self._sections:
+                return self._sections[revision_id]
+        data = self._get(action="parse", oldid=revision_id, prop="sections")
+        sections = [{"index": 0, "heading": "(introduction)", "level": 1}] + [
+            {"index": int(s["index"]), "heading": re.sub(r"<[^>]+>", "", s["line"]), "level": int(s["level"])}
+            for s in data.get("parse", {}).get("sections", []) if str(s.get("index", "")).isdigit()
+        ]
+        with self._lock:
+            self._sections[revision_id] = sections
+        return sections
+
+    def section(self, revision_id: int, index: int) -> dict:
+        """
+        Text and tables of one section, loaded on first access.
+        """
+        key = (revision_id, index)
+        with self._lock:
+            if key in self._section_content:
+                return self._section_content[key]
+        data = self._get(action="parse", oldid=revision_id, section=index, prop="text")
+        parser = _SectionParser()
+        parser.feed(data.get("parse", {}).get("text", ""))
+        content = parser.result()
+        with self._lock:
+            self._section_content[key] = content
+        return content
+
+    def find_section(self, revision_id: int, heading: str) -> Optional[dict]:
+        heading = heading.strip().lower()
+        sections = self.sections(revision_id)
+        for section in sections:
+            if section["heading"].lower() == heading:
+                return section
+        for section in sections:
+            if heading in section["heading"].lower():
+                return section
+        return None
+
+    def page_overviews(self, titles: List[str], as_of: Optional[str] = None, intro_chars: int = 1500) -> List[dict]:
+        """
+        Fetch the pinned revision, section headings and introduction of several pages concurrently.
+        Pages that cannot be fetched (HTTP error, deadline) are left out.
+        """
+        def overview(title: str) -> Optional[dict]:
+            revision = self.revision(title, as_of)
+            if revision is None:
+                return None
+            intro = self.section(revision["revision_id"], 0)
+            return {
+                **revision,
+                "sections": [s["heading"] for s in self.sections(revision["revision_id"])[1:]],
+                "introduction": intro["text"][:intro_chars],
+            }
+        # one context copy per task: the question deadline applies to every request
+        futures = [self._executor.submit(contextvars.copy_context().run, overview, title) for title in titles]
+        pages = []
+        for title, future in zip(titles, futures):
+            try:
+                page = future.result()
+            except Exception as e:
+                print(f"Could not fetch Wikipedia page '{title}': {e}")
+                continue
+            if page:
+                pages.append(page)
+        return pages
@@ -0,0 +1,129 @@
+"""
+Sharded evaluation through a local work queue.
+
+    python -m agent.worker enqueue --queue eval.sqlite            # push the /questions list to the queue
+    python -m agent.worker work --queue eval.sqlite --processes 4   # run N worker processes (on any host)
+    python -m agent.worker collect --queue eval.sqlite --output answers.json
+
+Run from the `src` directory. Workers on other hosts point --queue at the same file on a shared filesystem.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import requests
+from .runner import SmartyAgent, metrics_report
+from .workqueue import WorkQueue
+
+DEFAULT_API_URL = "https://agents-course-unit4-scoring.hf.space"
+HEARTBEAT_INTERVAL = 10
+
+def fetch_questions(api_url: str = DEFAULT_API_URL) -> list:
+    response = requests.get(f"{api_url}/questions", timeout=15)
+    response.raise_for_status()
+    return response.json()
+
+def run_worker(queue_path: str, heartbeat_timeout: float = 120.0):
+    """
+    Claim and answer questions until the queue is drained.
+    """
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    queue = WorkQueue(queue_path, heartbeat_timeout=heartbeat_timeout)
+    agent = SmartyAgent(draw_graph=False)
+    print(f"Worker {worker_id} started.")
+
+    stop = threading.Event()
+    def beat():
+        # separate connection: the main thread is busy running the agent
+        heartbeat_queue = WorkQueue(queue_path, heartbeat_timeout=heartbeat_timeout)
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            # a locked or busy queue file must not end the thread: the worker would then be taken for dead
+            try:
+                heartbeat_queue.heartbeat(worker_id)
+            except sqlite3.Error as e:
+                print(f"Worker {worker_id} could not send a heartbeat: {e}")
+        heartbeat_queue.close()
+    heartbeat_thread = threading.Thread(target=beat, daemon=True)
+    heartbeat_thread.start()
+
+    try:
+        while True:
+            try:
+                queue.requeue_dead()
+                item = queue.claim(worker_id)
+                drained = item is None and queue.drained()
+            except sqlite3.Error as e:
+                print(f"Worker {worker_id} could not claim a task: {e}")
+                time.sleep(HEARTBEAT_INTERVAL)
+                continue
+            if item is None:
+                if drained:
+                    break
+                # other workers still running: wait in case their tasks get requeued
+                time.sleep(HEARTBEAT_INTERVAL)
+                continue
+            task_id = item["task_id"]
+            try:
+                answer = agent(item["question"], task_id, file_name=item.get("file_name"))
+                queue.complete(task_id, worker_id, answer)
+                print(f"Worker {worker_id} answered task {task_id}.")
+            except Exception as e:
+                print(f"Error running agent on task {task_id}: {e}")
+                queue.fail(task_id, worker_id, str(e))
+    finally:
+        stop.set()
+        heartbeat_thread.join()
+        queue.close()
+    print(f"Worker {worker_id} finished.")
+    print(metrics_report())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sharded GAIA evaluation through a SQLite work queue")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="push questions to the queue")
+    enqueue_parser.add_argument("--queue", required=True)
+    enqueue_parser.add_argument("--api-url", default=DEFAULT_API_URL)
+
+    work_parser = subparsers.add_parser("work", help="run worker processes until the queue is drained")
+    work_parser.add_argument("--queue", required=True)
+    work_parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    work_parser.add_argument("--heartbeat-timeout", type=float, default=120.0)
+
+    collect_parser = subparsers.add_parser("collect", help="gather the answers in the /submit format")
+    collect_parser.add_argument("--queue", required=True)
+    collect_parser.add_argument("--output", default="-")
+
+    args = parser.parse_args(argv)
+    if args.command == "enqueue":
+        queue = WorkQueue(args.queue)
+        added = queue.enqueue(fetch_questions(args.api_url))
+        print(f"Enqueued {added} new questions. Queue: {queue.counts()}")
+    elif args.command == "work":
+        # spawn: every worker builds its own graph and clients
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=run_worker, args=(args.queue, args.heartbeat_timeout))
+                     for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        print(f"Queue: {WorkQueue(args.queue).counts()}")
+    elif args.command == "collect":
+        results = WorkQueue(args.queue).results()
+        answers = [{"task_id": r["task_id"], "submitted_answer": r["answer"]} for r in results if r["status"] == "done"]
+        output = json.dumps({"answers": answers, "results": results}, indent=2)
+        if args.output == "-":
+            print(output)
+        else:
+            with open(args.output, "w") as f:
+                f.write(output)
+            print(f"Collected {len(answers)} answers out of {len(results)} tasks into {args.output}.")
+
+if __name__ == "__main__":
+    main()
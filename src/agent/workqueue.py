@@ -0,0 +1,138 @@
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional
+
+class WorkQueue:
+    """
+    Durable work queue of questions backed by a SQLite file.
+
+    Any number of worker processes can share the file, on this host or on other hosts through a shared
+    filesystem with working file locks (the rollback journal is used: WAL needs memory shared by one host). Claimed tasks are kept alive by heartbeats; tasks whose worker
+    stopped sending heartbeats are put back in the queue, up to `max_attempts` claims per task.
+    """
+
+    def __init__(self, path: str, heartbeat_timeout: float = 120.0, max_attempts: int = 3):
+        self.path = path
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                payload TEXT,
+                status TEXT DEFAULT 'pending',
+                worker_id TEXT,
+                heartbeat_at REAL,
+                attempts INTEGER DEFAULT 0,
+                answer TEXT,
+                error TEXT,
+                enqueued_at REAL,
+                finished_at REAL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status, enqueued_at)")
+
+    def enqueue(self, items: List[dict]) -> int:
+        """
+        Add questions ({"task_id", "question", ...}) to the queue. Already queued task_ids are kept as they are.
+        Returns the number of new tasks.
+        """
+        now = time.time()
+        cursor = self._conn.executemany(
+            "INSERT OR IGNORE INTO tasks (task_id, payload, enqueued_at) VALUES (?, ?, ?)",
+            [(item["task_id"], json.dumps(item), now) for item in items if item.get("task_id")],
+        )
+        return cursor.rowcount
+
+    def requeue_dead(self) -> int:
+        """
+        Put back running tasks whose worker missed its heartbeats; fail them after `max_attempts`.
+        """
+        cutoff = time.time() - self.heartbeat_timeout
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "UPDATE tasks SET status = 'failed', error = 'worker died', finished_at = ? "
+                "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+                (time.time(), cutoff, self.max_attempts),
+            )
+            cursor = self._conn.execute(
+                "UPDATE tasks SET status = 'pending', worker_id = NULL WHERE status = 'running' AND heartbeat_at < ?",
+                (cutoff,),
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount
+
+    def claim(self, worker_id: str) -> Optional[dict]:
+        """
+        Atomically claim the oldest pending task for `worker_id`. Returns its payload, or None if none is pending.
+        """
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._conn.execute(
+                "SELECT task_id, payload FROM tasks WHERE status = 'pending' ORDER BY enqueued_at, task_id LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE tasks SET status = 'running', worker_id = ?, heartbeat_at = ?, attempts = attempts + 1 "
+                    "WHERE task_id = ?",
+                    (worker_id, time.time(), row[0]),
+                )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return json.loads(row[1]) if row else None
+
+    def heartbeat(self, worker_id: str):
+        self._conn.execute(
+            "UPDATE tasks SET heartbeat_at = ? WHERE status = 'running' AND worker_id = ?",
+            (time.time(), worker_id),
+        )
+
+    def complete(self, task_id: str, worker_id: str, answer: str):
+        self._conn.execute(
+            "UPDATE tasks SET status = 'done', answer = ?, finished_at = ? WHERE task_id = ? AND worker_id = ?",
+            (answer, time.time(), task_id, worker_id),
+        )
+
+    def fail(self, task_id: str, worker_id: str, error: str):
+        """
+        Record a failed attempt: the task goes back to the queue until it used its `max_attempts`.
+        """
+        self._conn.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "error = ?, worker_id = NULL, finished_at = ? WHERE task_id = ? AND worker_id = ?",
+            (self.max_attempts, error, time.time(), task_id, worker_id),
+        )
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return dict(rows)
+
+    def drained(self) -> bool:
+        counts = self.counts()
+        return not counts.get("pending") and not counts.get("running")
+
+    def results(self) -> List[dict]:
+        """
+        One entry per task: task_id, question, status, answer and error.
+        """
+        rows = self._conn.execute(
+            "SELECT task_id, payload, status, answer, error FROM tasks ORDER BY enqueued_at, task_id"
+        ).fetchall()
+        return [
+            {"task_id": task_id, "question": json.loads(payload).get("question"), "status": status,
+             "answer": answer, "error": error}
+            for task_id, payload, status, answer, error in rows
+        ]
+
+    def close(self):
+        self._conn.close()
@@ -1,23 +1,70 @@
 import os
+import re
+import threading
+import time
 import pandas as pd
 import requests
 import gradio as gr
-from agent import AgentState, build_graph
+from agent import Job, JobManager, JobRejected, SmartyAgent, metrics, metrics_report, prefetcher
 
 # (Keep Constants as is)
 # --- Constants ---
 DEFAULT_API_URL = "https://agents-course-unit4-scoring.hf.space"
 
 # --- Agent Definition ---
-class SmartyAgent:
-    def __init__(self):
-        print("Agent initialized.")
-        self.agent = build_graph()
-    # __call__ turns an instance of SmartyAgent into a callable object
-    def __call__(self, question: str, task_id: str) -> str:
-        print(f"Agent received question (first 50 chars): {question[:50]}...")
-        response = self.agent.invoke(AgentState({'question':question, 'task_id': task_id}))
-        return response['answer']
+# SmartyAgent lives in the agent package (agent/runner.py) so it can run without gradio
+# Warm agent shared by the interactive path: the graph is compiled once per process
+_warm_agent = None
+_warm_agent_lock = threading.Lock()
+
+def get_warm_agent() -> SmartyAgent:
+    global _warm_agent
+    with _warm_agent_lock:
+        if _warm_agent is None:
+            _warm_agent = SmartyAgent()
+        return _warm_agent
+
+# Background evaluation jobs: a bounded pool sharing the warm agent, with admission control
+job_manager = JobManager(
+    get_warm_agent,
+    max_running=int(os.getenv("JOBS_MAX_RUNNING", 2)),
+    max_queued=int(os.getenv("JOBS_MAX_QUEUED", 4)),
+)
+
+def poll_job(job_id: str | None):
+    """
+    Returns the status and the per-question results of a job, and the polling timer: stopped once the job
+    is finished or missing, so that idle sessions do not take up queue slots.
+    """
+    if not job_id:
+        return gr.update(), gr.update(), gr.Timer(active=False)
+    job = job_manager.get(job_id)
+    if job is None:
+        return f"Job {job_id} not found.", pd.DataFrame(), gr.Timer(active=False)
+    snapshot = job.snapshot()
+    status = f"Job {job.id}: {snapshot['status']} ({snapshot['done']}/{snapshot['total']} questions)\n{snapshot['message']}"
+    finished = snapshot["status"] in ("done", "failed")
+    if finished:
+        status += "\n\n" + metrics_report()
+    results = [{k: v for k, v in r.items() if k != "error"} for r in snapshot["results"]]
+    return status, pd.DataFrame(results), gr.Timer(active=not finished)
+
+def start_polling(job_id: str | None):
+    """
+    Starts the polling timer when a job was submitted.
+    """
+    return gr.Timer(active=job_id is not None)
+
+def mark_selected_verified(selected_questions):
+    """
+    Marks the answers to the selected questions as verified correct (e.g. after checking them by hand).
+    """
+    if not selected_questions:
+        return "No questions selected."
+    agent = get_warm_agent()
+    for task_id in selected_questions:
+        agent.mark_verified(task_id)
+    return f"Marked {len(selected_questions)} answers as verified."
 
 def fetch_questions_for_selection():
     """
@@ -52,10 +99,11 @@ def fetch_questions_for_selection():
 
 def run_and_submit_test(selected_questions):
     """
-    Fetches questions, runs the BasicAgent on selected questions only, and displays the result.
+    Fetches questions and starts a background job running the agent on the selected questions only.
+    Returns the status, an empty results table and the job id; results are polled with poll_job.
     """
     if not selected_questions:
-        return "No questions selected. Please select at least one question to run the test.", pd.DataFrame()
+        return "No questions selected. Please select at least one question to run the test.", pd.DataFrame(), None
 
     # --- Determine HF Space Runtime URL and Repo URL ---
     space_id = os.getenv("SPACE_ID") # Get the SPACE_ID for sending link to the code
@@ -63,13 +111,6 @@ def run_and_submit_test(selected_questions):
     api_url = DEFAULT_API_URL
     questions_url = f"{api_url}/questions"
 
-    # 1. Instantiate Agent ( modify this part to create your agent)
-    try:
-        agent = SmartyAgent()
-    except Exception as e:
-        print(f"Error instantiating agent: {e}")
-        return f"Error initializing agent: {e}", pd.DataFrame()
-    
     # In the case of an app running as a hugging Face space, this link points toward your codebase ( usefull for others so please keep it public)
     agent_code = f"https://huggingface.co/spaces/{space_id}/tree/main"
     print(agent_code)
@@ -82,52 +123,36 @@ def run_and_submit_test(selected_questions):
         questions_data = response.json()
         if not questions_data:
              print("Fetched questions list is empty.")
-             return "Fetched questions list is empty or invalid format.", pd.DataFrame()
+             return "Fetched questions list is empty or invalid format.", pd.DataFrame(), None
         print(f"Fetched {len(questions_data)} questions.")
+        # download attachments of the selected questions in the background while the agent works
+        prefetcher.prefetch(item for item in questions_data if item.get("task_id") in selected_questions)
     except requests.exceptions.RequestException as e:
         print(f"Error fetching questions: {e}")
-        return f"Error fetching questions: {e}", pd.DataFrame()
+        return f"Error fetching questions: {e}", pd.DataFrame(), None
     except requests.exceptions.JSONDecodeError as e:
          print(f"Error decoding JSON response from questions endpoint: {e}")
          print(f"Response text: {response.text[:500]}")
-         return f"Error decoding server response for questions: {e}", pd.DataFrame()
+         return f"Error decoding server response for questions: {e}", pd.DataFrame(), None
     except Exception as e:
         print(f"An unexpected error occurred fetching questions: {e}")
-        return f"An unexpected error occurred fetching questions: {e}", pd.DataFrame()
-
-    # 3. Run your Agent on selected questions only
-    results_log = []
-    answers_payload = []
-    print(f"Running agent on {len(selected_questions)} selected questions...")
-    for item in questions_data:
-        task_id = item.get("task_id")
-        question_text = item.get("question")
-        # Only process if this question was selected
-        if task_id not in selected_questions:
-            continue
-        if not task_id or question_text is None:
-            print(f"Skipping item with missing task_id or question: {item}")
-            continue
-        try:
-            # >>>>>>>> HERE <<<<<<<<
-            # __call__ formats the input parameters as the Agent State
-            submitted_answer = agent(question_text, task_id)
-            answers_payload.append({"task_id": task_id, "submitted_answer": submitted_answer})
-            results_log.append({"Task ID": task_id, "Question": question_text, "Submitted Answer": submitted_answer})
-        except Exception as e:
-             print(f"Error running agent on task {task_id}: {e}")
-             results_log.append({"Task ID": task_id, "Question": question_text, "Submitted Answer": f"AGENT ERROR: {e}"})
-
-    if not answers_payload:
-        print("Agent did not produce any answers to submit.")
-        return "Agent did not produce any answers to submit.", pd.DataFrame(results_log)
+        return f"An unexpected error occurred fetching questions: {e}", pd.DataFrame(), None
 
-    return f"Agent finished running on {len(results_log)} selected questions.", pd.DataFrame(results_log)
+    # 3. Run your Agent on selected questions only, as a background job sharing the warm agent
+    selected = [item for item in questions_data
+                if item.get("task_id") in selected_questions and item.get("question") is not None]
+    try:
+        job = job_manager.submit(selected)
+    except JobRejected as e:
+        print(f"Job rejected: {e}")
+        return str(e), pd.DataFrame(), None
+    print(f"Running agent on {len(selected)} selected questions in job {job.id}...")
+    return f"Job {job.id} queued: {len(selected)} selected questions.", pd.DataFrame(), job.id
 
 def run_and_submit_all(profile: gr.OAuthProfile | None):
     """
-    Fetches all questions, runs the BasicAgent on them, submits all answers,
-    and displays the results.
+    Fetches all questions and starts a background job running the agent on them, which submits all
+    answers when it finishes. Returns the status, an empty results table and the job id.
     """
     # --- Determine HF Space Runtime URL and Repo URL ---
     space_id = os.getenv("SPACE_ID") # Get the SPACE_ID for sending link to the code
@@ -137,18 +162,11 @@ def run_and_submit_all(profile: gr.OAuthProfile | None):
         print(f"User logged in: {username}")
     else:
         print("User not logged in.")
-        return "Please Login to Hugging Face with the button.", None
+        return "Please Login to Hugging Face with the button.", None, None
 
     api_url = DEFAULT_API_URL
     questions_url = f"{api_url}/questions"
-    submit_url = f"{api_url}/submit"
 
-    # 1. Instantiate Agent ( modify this part to create your agent)
-    try:
-        agent = SmartyAgent()
-    except Exception as e:
-        print(f"Error instantiating agent: {e}")
-        return f"Error initializing agent: {e}", None
     # In the case of an app running as a hugging Face space, this link points toward your codebase ( usefull for others so please keep it public)
     agent_code = f"https://huggingface.co/spaces/{space_id}/tree/main"
     print(agent_code)
@@ -161,40 +179,41 @@ def run_and_submit_all(profile: gr.OAuthProfile | None):
         questions_data = response.json()
         if not questions_data:
              print("Fetched questions list is empty.")
-             return "Fetched questions list is empty or invalid format.", None
+             return "Fetched questions list is empty or invalid format.", None, None
         print(f"Fetched {len(questions_data)} questions.")
+        # download attachments in the background while the agent works
+        prefetcher.prefetch(questions_data)
     except requests.exceptions.RequestException as e:
         print(f"Error fetching questions: {e}")
-        return f"Error fetching questions: {e}", None
+        return f"Error fetching questions: {e}", None, None
     except requests.exceptions.JSONDecodeError as e:
          print(f"Error decoding JSON response from questions endpoint: {e}")
          print(f"Response text: {response.text[:500]}")
-         return f"Error decoding server response for questions: {e}", None
+         return f"Error decoding server response for questions: {e}", None, None
     except Exception as e:
         print(f"An unexpected error occurred fetching questions: {e}")
-        return f"An unexpected error occurred fetching questions: {e}", None
-
-    # 3. Run your Agent
-    results_log = []
-    answers_payload = []
-    print(f"Running agent on {len(questions_data)} questions...")
-    for item in questions_data:
-        task_id = item.get("task_id")
-        question_text = item.get("question")
-        if not task_id or question_text is None:
-            print(f"Skipping item with missing task_id or question: {item}")
-            continue
-        try:
-            submitted_answer = agent(question_text, task_id)
-            answers_payload.append({"task_id": task_id, "submitted_answer": submitted_answer})
-            results_log.append({"Task ID": task_id, "Question": question_text, "Submitted Answer": submitted_answer})
-        except Exception as e:
-             print(f"Error running agent on task {task_id}: {e}")
-             results_log.append({"Task ID": task_id, "Question": question_text, "Submitted Answer": f"AGENT ERROR: {e}"})
+        return f"An unexpected error occurred fetching questions: {e}", None, None
 
+    # 3. Run your Agent as a background job sharing the warm agent; answers are submitted when it finishes
+    questions = [item for item in questions_data if item.get("task_id") and item.get("question") is not None]
+    try:
+        job = job_manager.submit(questions, on_complete=lambda job: submit_answers(username, agent_code, job))
+    except JobRejected as e:
+        print(f"Job rejected: {e}")
+        return str(e), None, None
+    print(f"Running agent on {len(questions)} questions in job {job.id}...")
+    return f"Job {job.id} queued: {len(questions)} questions. Answers are submitted when it finishes.", None, job.id
+
+def submit_answers(username: str, agent_code: str, job: Job) -> str:
+    """
+    Submits the answers of a finished job and returns the submission status.
+    """
+    api_url = DEFAULT_API_URL
+    submit_url = f"{api_url}/submit"
+    answers_payload = job.answers_payload
     if not answers_payload:
         print("Agent did not produce any answers to submit.")
-        return "Agent did not produce any answers to submit.", pd.DataFrame(results_log)
+        return "Agent did not produce any answers to submit."
 
     # 4. Prepare Submission 
     submission_data = {"username": username.strip(), "agent_code": agent_code, "answers": answers_payload}
@@ -215,8 +234,12 @@ def run_and_submit_all(profile: gr.OAuthProfile | None):
             f"Message: {result_data.get('message', 'No message received.')}"
         )
         print("Submission successful.")
-        results_df = pd.DataFrame(results_log)
-        return final_status, results_df
+        # a perfect score verifies every answer: they join the answer cache and plan library as verified
+        if answers_payload and result_data.get('correct_count') == len(answers_payload):
+            for answer in answers_payload:
+                get_warm_agent().mark_verified(answer["task_id"])
+            final_status += f"\nMarked {len(answers_payload)} answers as verified."
+        return final_status
     except requests.exceptions.HTTPError as e:
         error_detail = f"Server responded with status {e.response.status_code}."
         try:
@@ -226,34 +249,69 @@ def run_and_submit_all(profile: gr.OAuthProfile | None):
             error_detail += f" Response: {e.response.text[:500]}"
         status_message = f"Submission Failed: {error_detail}"
         print(status_message)
-        results_df = pd.DataFrame(results_log)
-        return status_message, results_df
+        return status_message
     except requests.exceptions.Timeout:
         status_message = "Submission Failed: The request timed out."
         print(status_message)
-        results_df = pd.DataFrame(results_log)
-        return status_message, results_df
+        return status_message
     except requests.exceptions.RequestException as e:
         status_message = f"Submission Failed: Network error - {e}"
         print(status_message)
-        results_df = pd.DataFrame(results_log)
-        return status_message, results_df
+        return status_message
     except Exception as e:
         status_message = f"An unexpected error occurred during submission: {e}"
         print(status_message)
-        results_df = pd.DataFrame(results_log)
-        return status_message, results_df
+        return status_message
+
+# Partial "answer" value in the streamed arguments of the FinalAnswer structured output
+_PARTIAL_ANSWER = re.compile(r'"answer"\s*:\s*"((?:[^"\\]|\\.)*)')
 
-def submit_question(question: str):
-    # 1. Instantiate Agent ( modify this part to create your agent)
+async def submit_question(question: str):
+    """
+    Streams the interactive run: the plan as soon as the planner returns, tool calls as they happen,
+    then the final-answer tokens. Yields (trace, answer) updates.
+    """
     try:
-        agent = SmartyAgent()
+        agent = get_warm_agent()
     except Exception as e:
         print(f"Error instantiating agent: {e}")
-        return f"Error initializing agent: {e}", pd.DataFrame()
-    
-    answer = agent(question, "000")
-    return answer
+        yield f"Error initializing agent: {e}", ""
+        return
+
+    start = time.monotonic()
+    trace, answer, answer_args = [], "", ""
+    first_token = True
+    try:
+        async for event in agent.astream(question):
+            kind, name = event["event"], event.get("name")
+            node = event.get("metadata", {}).get("langgraph_node")
+            if kind == "on_chain_end" and name == "planner" and node == "planner":
+                metrics.observe("interactive.time_to_plan", time.monotonic() - start)
+                plan = event["data"]["output"].get("plan", [])
+                trace.append("Plan:\n" + "\n".join(f"{i+1}. {step}" for i, step in enumerate(plan)))
+            elif kind == "on_tool_start":
+                trace.append(f"Tool call: {name}({event['data'].get('input')})")
+            elif kind == "on_chat_model_stream" and node == "final_answer":
+                chunk = event["data"]["chunk"]
+                answer_args += "".join(c.get("args") or "" for c in getattr(chunk, "tool_call_chunks", []))
+                match = _PARTIAL_ANSWER.search(answer_args)
+                if not match or match.group(1) == answer:
+                    continue
+                if first_token:
+                    metrics.observe("interactive.time_to_first_token", time.monotonic() - start)
+                    first_token = False
+                answer = match.group(1)
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                answer = event["data"]["output"]["answer"]
+            else:
+                continue
+            yield "\n\n".join(trace), answer
+    except Exception as e:
+        print(f"Error running agent on interactive question: {e}")
+        yield "\n\n".join(trace + [f"AGENT ERROR: {e}"]), answer
+        return
+    metrics.observe("interactive.total_time", time.monotonic() - start)
+    yield "\n\n".join(trace), answer
 
 # --- Build Gradio Interface using Blocks ---
 with gr.Blocks() as demo:
@@ -285,19 +343,26 @@ with gr.Blocks() as demo:
     status_output = gr.Textbox(label="Run Status / Submission Result", lines=5, interactive=False)
     results_table = gr.DataFrame(label="Questions and Agent Answers", wrap=True)
 
-    run_button.click(fn=run_and_submit_all, outputs=[status_output, results_table])
+    # the job runs in the background: the click returns its id and a timer polls its progress
+    run_job_id = gr.State(None)
+    run_timer = gr.Timer(2.0, active=False)
+    run_button.click(fn=run_and_submit_all, outputs=[status_output, results_table, run_job_id]).then(
+        fn=start_polling, inputs=[run_job_id], outputs=[run_timer])
+    run_timer.tick(fn=poll_job, inputs=[run_job_id], outputs=[status_output, results_table, run_timer])
 
     gr.Markdown("## Make your own question")
     # add a textbox for the user to input a question
     question_input = gr.Textbox(label="Question", lines=1, interactive=True)
     # add a button to submit the question
     submit_question_button = gr.Button("Submit Question", variant="primary")
+    # add a textbox to display the plan and tool calls as they happen
+    question_trace = gr.Textbox(label="Plan and tool calls", lines=6, interactive=False)
     # add a textbox to display the question
     question_output = gr.Textbox(label="Answer", lines=1, interactive=False)
-    
+
 
     # wire up the interactions
-    submit_question_button.click(fn=submit_question, inputs=[question_input], outputs=[question_output])
+    submit_question_button.click(fn=submit_question, inputs=[question_input], outputs=[question_trace, question_output])
 
     gr.Markdown("---")
 
@@ -315,6 +380,7 @@ with gr.Blocks() as demo:
     )
     
     run_test_button = gr.Button("Run Test Evaluation on Selected Questions", variant="primary")
+    verify_button = gr.Button("Mark Answers to Selected Questions as Verified", variant="secondary")
 
     status_output_test = gr.Textbox(label="Run Status / Submission Result", lines=5, interactive=False)
     results_table_test = gr.DataFrame(label="Questions and Agent Answers", wrap=True)
@@ -325,11 +391,16 @@ with gr.Blocks() as demo:
         outputs=[question_checkboxes, question_status]
     )
     
+    verify_button.click(fn=mark_selected_verified, inputs=[question_checkboxes], outputs=[status_output_test])
+
+    test_job_id = gr.State(None)
+    test_timer = gr.Timer(2.0, active=False)
     run_test_button.click(
         fn=run_and_submit_test,
         inputs=[question_checkboxes],
-        outputs=[status_output_test, results_table_test]
-    )
+        outputs=[status_output_test, results_table_test, test_job_id]
+    ).then(fn=start_polling, inputs=[test_job_id], outputs=[test_timer])
+    test_timer.tick(fn=poll_job, inputs=[test_job_id], outputs=[status_output_test, results_table_test, test_timer])
 
 
 if __name__ == "__main__":
@@ -358,6 +429,11 @@ if __name__ == "__main__":
     # Get port from environment variable (Render sets this automatically)
     port = int(os.getenv("PORT", 7860))  # Default to 7860 if PORT not set
     
+    # bound the request queue so that a burst of visitors waits instead of piling up handlers
+    demo.queue(
+        default_concurrency_limit=int(os.getenv("GRADIO_CONCURRENCY_LIMIT", 4)),
+        max_size=int(os.getenv("GRADIO_QUEUE_SIZE", 32)),
+    )
     demo.launch(
         debug=True, 
         share=False,
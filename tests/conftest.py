@@ -0,0 +1,9 @@
+import os
+import sys
+
+# the agent package lives in src/, where the app and the CLIs run from
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# model clients are created when the package is imported; the tests never call them
+for key in ("OPENAI_API_KEY", "GROQ_API_KEY", "TAVILY_API_KEY", "GEMINI_API_KEY"):
+    os.environ.setdefault(key, "test")
@@ -0,0 +1,40 @@
+import pytest
+
+from agent.cache import AnswerCache
+
+QUESTION = "How many rows of the attached spreadsheet have a price above 10?"
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnswerCache(str(tmp_path / "answers.sqlite"), version="test")
+
+def test_tasks_with_the_same_question_keep_their_answers(cache):
+    cache.put(QUESTION, "task-a", "3", file_name="a.xlsx")
+    cache.put(QUESTION, "task-b", "7", file_name="b.xlsx")
+    assert cache.get(QUESTION, "task-a", "a.xlsx")["answer"] == "3"
+    assert cache.get(QUESTION, "task-b", "b.xlsx")["answer"] == "7"
+
+def test_attachment_answer_is_not_served_to_another_task(cache):
+    cache.put(QUESTION, "task-a", "3", verified=True, file_name="a.xlsx")
+    assert cache.get(QUESTION, "task-b", "b.xlsx") is None
+    assert cache.get(QUESTION, "task-b", "") is None
+    assert cache.get(QUESTION) is None
+    assert cache.get_similar(QUESTION + " Answer with a number.") is None
+
+def test_questions_without_attachment_share_answers(cache):
+    question = ("In which year did the Eiffel Tower, the wrought-iron lattice tower on the Champ de Mars in Paris, "
+                "open to the public?")
+    reworded = question.replace("In which year", "In what year")
+    cache.put(question, "task-a", "1889", verified=True, file_name="")
+    assert cache.get(question.lower(), "task-b", "")["answer"] == "1889"
+    assert cache.get(question)["answer"] == "1889"
+    assert cache.get_similar(reworded)["answer"] == "1889"
+    # the asking task has an attachment: only its own entry can answer it
+    assert cache.get(question, "task-c", "c.png") is None
+    assert cache.get_similar(reworded, "task-c", "c.png") is None
+
+def test_unknown_attachment_is_not_shared(cache):
+    cache.put(QUESTION, "task-a", "3")
+    assert cache.get(QUESTION, "task-a")["answer"] == "3"
+    assert cache.get(QUESTION, "task-b", "") is None
+    assert cache.get(QUESTION) is None
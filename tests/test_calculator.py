@@ -0,0 +1,74 @@
+import ast
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from agent.tools import _MAX_EXPONENT, _check_power, _evaluate_node, calculator
+
+def evaluate(expression: str, variables: dict = None, exact: bool = False):
+    return _evaluate_node(ast.parse(expression, mode="eval"), variables or {}, exact)
+
+def calculate(expression: str, **kwargs) -> str:
+    return calculator.invoke({"expression": expression, **kwargs})
+
+def test_arithmetic_and_precedence():
+    assert evaluate("(2 + 3) * 4 - 10 / 4") == 17.5
+    assert evaluate("7 // 2 + 7 % 2 + 2 ** 3") == 12
+    assert evaluate("-x + 1", {"x": 2.0}) == -1.0
+
+def test_aggregates_over_a_list_or_the_arguments():
+    assert evaluate("max([3, 5, 4])") == 5
+    assert evaluate("max(3, 5)") == 5
+    assert evaluate("min(3, 5, 1)") == 1
+    assert evaluate("sum(a, [1, 2])", {"a": np.array([3.0, 4.0])}) == 10
+    assert evaluate("mean(2, 4)") == 3
+    assert evaluate("max(3, 5)", exact=True) == Decimal("5")
+
+def test_vectorized_operations():
+    assert evaluate("sum(prices * quantities)", {"prices": np.array([1.5, 2.0]), "quantities": np.array([2.0, 3.0])}) == 9
+    assert evaluate("x > 10", {"x": np.array([5.0, 15.0])}).tolist() == [False, True]
+    assert evaluate("percent(1, 4)") == 25
+    assert evaluate("pct_change(80, 100)") == 25
+
+def test_exact_decimals():
+    assert evaluate("0.1 + 0.2", exact=True) == Decimal("0.3")
+
+def test_unsupported_elements_are_rejected():
+    for expression in ("__import__('os')", "x.real", "open('f')", "max(3, key=abs)", "[i for i in [1]]"):
+        with pytest.raises(ValueError):
+            evaluate(expression, {"x": 1.0})
+    with pytest.raises(ValueError, match="Unknown name"):
+        evaluate("y + 1")
+
+def test_power_size_guards():
+    _check_power(2, 10)
+    _check_power(np.array([2.0, 3.0]), 3)
+    with pytest.raises(ValueError, match="Exponent too large"):
+        _check_power(2, _MAX_EXPONENT + 1)
+    with pytest.raises(ValueError, match="Exponent too large"):
+        _check_power(2, 10**100)
+    with pytest.raises(ValueError, match="Exponent too large"):
+        _check_power(2, np.array([1.0, 2e3]))
+    with pytest.raises(ValueError, match="Result too large"):
+        _check_power(10**100, 1_000)
+    with pytest.raises(ValueError, match="Result too large"):
+        _check_power(Decimal("1e100"), 200)
+    with pytest.raises(ValueError, match="Exponent too large"):
+        evaluate("9 ** 9 ** 9")
+
+def test_calculator_formats_the_result():
+    assert calculate("max(3, 5)") == "5"
+    assert calculate("2 / 3", decimals=2) == "0.67"
+    assert calculate("1234567", unit="million", decimals=1) == "1.2"
+    assert calculate("cumsum(x)", variables={"x": ["1,000", 2, "3.5"]}) == "[1000, 1002, 1005.5]"
+    assert calculate("0.1 + 0.2", exact=True) == "0.3"
+
+def test_calculator_returns_errors_as_text():
+    assert calculate("1 / 0") == "Error: division by zero is not allowed"
+    assert calculate("1e308 * 10").startswith("Error:")
+    assert calculate("log(0)").startswith("Error:")
+    assert calculate("2 ** 100000").startswith("Error:")
+    assert calculate("foo(1)").startswith("Error: invalid expression")
+    assert calculate("1 +").startswith("Error:")
+    assert calculate("1", unit="dozen").startswith("Error: unsupported unit")
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+from typing import List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+from agent.hedging import HedgedChatModel, HedgePolicy
+
+class SlowFakeChatModel(BaseChatModel):
+    """
+    Fake chat model answering call number i after delays[i] seconds (the last delay is reused).
+    """
+    delays: List[float]
+    calls: int = 0
+    cancelled: int = 0
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-fake"
+
+    def _next_call(self):
+        with self._lock:
+            index = self.calls
+            self.calls += 1
+        return index, self.delays[min(index, len(self.delays) - 1)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        index, delay = self._next_call()
+        time.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"call {index}"))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        index, delay = self._next_call()
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"call {index}"))])
+
+def hedging_policy(**kwargs) -> HedgePolicy:
+    # hedge after 50ms until enough latencies are observed
+    defaults = {"default_delay": 0.05, "min_samples": 1000, "max_hedge_rate": 1.0}
+    return HedgePolicy(**{**defaults, **kwargs})
+
+def test_budget_limits_the_share_of_hedged_calls():
+    policy = HedgePolicy(max_hedge_rate=0.5)
+    fired = []
+    for _ in range(10):
+        policy.record_call("model")
+        fired.append(policy.try_hedge("model"))
+    metrics = policy.metrics()["model"]
+    assert sum(fired) == 5
+    assert metrics["hedges_fired"] == 5
+    assert metrics["hedges_skipped"] == 5
+
+def test_hedge_delay_is_the_rolling_percentile():
+    policy = HedgePolicy(percentile=0.9, min_samples=10, default_delay=15.0)
+    assert policy.hedge_delay("model") == 15.0
+    for latency in range(1, 11):
+        policy.record_latency("model", float(latency))
+    assert policy.hedge_delay("model") == 10.0
+
+def test_fast_call_is_not_hedged():
+    inner = SlowFakeChatModel(delays=[0.0])
+    policy = hedging_policy()
+    model = HedgedChatModel(inner=inner, policy=policy)
+    assert model.invoke("question").content == "call 0"
+    assert inner.calls == 1
+    assert policy.metrics()["slow-fake"]["hedges_fired"] == 0
+
+def test_hedge_wins_over_slow_primary():
+    inner = SlowFakeChatModel(delays=[2.0, 0.0])
+    policy = hedging_policy()
+    model = HedgedChatModel(inner=inner, policy=policy)
+    start = time.monotonic()
+    assert model.invoke("question").content == "call 1"
+    assert time.monotonic() - start < 1.0
+    metrics = policy.metrics()["slow-fake"]
+    assert metrics["hedges_fired"] == 1
+    assert metrics["hedges_won"] == 1
+
+def test_no_hedge_without_budget():
+    inner = SlowFakeChatModel(delays=[0.2])
+    policy = hedging_policy(max_hedge_rate=0.0)
+    model = HedgedChatModel(inner=inner, policy=policy)
+    assert model.invoke("question").content == "call 0"
+    assert inner.calls == 1
+    assert policy.metrics()["slow-fake"]["hedges_skipped"] == 1
+
+def test_async_hedge_cancels_the_losing_request():
+    inner = SlowFakeChatModel(delays=[2.0, 0.0])
+    policy = hedging_policy()
+    model = HedgedChatModel(inner=inner, policy=policy)
+
+    async def run():
+        result = await model.ainvoke("question")
+        # let the cancellation reach the primary request
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()).content == "call 1"
+    assert inner.cancelled == 1
+    assert policy.metrics()["slow-fake"]["hedges_won"] == 1
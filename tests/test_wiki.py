@@ -0,0 +1,119 @@
+import pytest
+import requests
+
+from agent.wiki import WikipediaClient, _as_of_timestamp
+
+SECTIONS = {
+    "parse": {
+        "sections": [
+            {"index": "1", "line": "Biography", "level": "2"},
+            {"index": "2", "line": "<i>Studio</i> albums", "level": "2"},
+            {"index": "T-1", "line": "Transcluded", "level": "2"},
+        ]
+    }
+}
+
+ALBUMS_HTML = """
+<p>Albums released by the singer<sup>[1]</sup>.</p>
+<table>
+  <tr><th>Year</th><th>Title</th></tr>
+  <tr><td>2000</td><td>Misa <b>Criolla</b></td></tr>
+  <tr><td>2005</td><td>Corazón Libre</td></tr>
+</table>
+<p>See also the live albums.</p>
+"""
+
+class FakeResponse:
+    def __init__(self, data: dict, status: int = 200):
+        self.data = data
+        self.status = status
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise requests.HTTPError(f"{self.status} error")
+
+    def json(self) -> dict:
+        return self.data
+
+class FakeSession:
+    """
+    Stand-in for the MediaWiki API: answers revision, sections and section text queries of two revisions.
+    """
+
+    def __init__(self):
+        self.headers = {}
+        self.requests = []
+
+    def get(self, url, params=None, timeout=None):
+        self.requests.append(params)
+        if params.get("prop") == "revisions":
+            if params["titles"] == "Missing":
+                return FakeResponse({}, status=500)
+            revid = 100 if params.get("rvstart", "9999") < "2023" else 200
+            return FakeResponse({"query": {"pages": [{"title": params["titles"],
+                                                      "revisions": [{"revid": revid, "timestamp": "2022-11-01T10:00:00Z"}]}]}})
+        if params.get("prop") == "sections":
+            return FakeResponse(SECTIONS)
+        if params.get("prop") == "text":
+            html = ALBUMS_HTML if params["section"] == 2 else "<p>Introduction of the page.</p>"
+            return FakeResponse({"parse": {"text": html}})
+        return FakeResponse({"error": {"info": "unknown action"}})
+
+@pytest.fixture
+def session():
+    return FakeSession()
+
+@pytest.fixture
+def client(session):
+    return WikipediaClient(api_url="http://wiki.test/api.php", session=session)
+
+def test_as_of_timestamp_is_the_end_of_the_period():
+    assert _as_of_timestamp("2022") == "2022-12-31T23:59:59Z"
+    assert _as_of_timestamp("2024-02") == "2024-02-29T23:59:59Z"
+    assert _as_of_timestamp("2021-06-15") == "2021-06-15T23:59:59Z"
+
+def test_as_of_timestamp_tolerates_wording():
+    assert _as_of_timestamp("end of 2022") == "2022-12-31T23:59:59Z"
+    assert _as_of_timestamp("June 2022") == "2022-06-30T23:59:59Z"
+    assert _as_of_timestamp("2022-06-15T10:00:00Z") == "2022-06-15T23:59:59Z"
+
+def test_as_of_timestamp_rejects_unknown_dates():
+    for as_of in ("last year", "2022-13", "2023-02-30", ""):
+        with pytest.raises(ValueError, match="YYYY-MM-DD"):
+            _as_of_timestamp(as_of)
+
+def test_revision_is_pinned_to_the_date(client, session):
+    revision = client.revision("Mercedes Sosa", as_of="2022")
+    assert revision == {"title": "Mercedes Sosa", "revision_id": 100, "timestamp": "2022-11-01T10:00:00Z"}
+    params = session.requests[-1]
+    assert params["rvstart"] == "2022-12-31T23:59:59Z"
+    assert params["rvdir"] == "older"
+
+def test_latest_revision_without_date(client, session):
+    assert client.revision("Mercedes Sosa")["revision_id"] == 200
+    assert "rvstart" not in session.requests[-1]
+
+def test_sections_are_listed_and_cached(client, session):
+    sections = client.sections(100)
+    assert [s["heading"] for s in sections] == ["(introduction)", "Biography", "Studio albums"]
+    client.sections(100)
+    assert sum(1 for params in session.requests if params.get("prop") == "sections") == 1
+
+def test_find_section_exact_then_partial(client):
+    assert client.find_section(100, "biography")["index"] == 1
+    assert client.find_section(100, "albums")["index"] == 2
+    assert client.find_section(100, "discography") is None
+
+def test_section_text_and_tables(client):
+    content = client.section(100, 2)
+    assert content["tables"] == [[["Year", "Title"], ["2000", "Misa Criolla"], ["2005", "Corazón Libre"]]]
+    assert "Albums released by the singer." in content["text"]
+    assert "[1]" not in content["text"]
+    assert "Misa" not in content["text"]
+
+def test_page_overviews_drop_failed_pages(client):
+    pages = client.page_overviews(["Mercedes Sosa", "Missing"], as_of="2022")
+    assert len(pages) == 1
+    assert pages[0]["revision_id"] == 100
+    assert pages[0]["sections"] == ["Biography", "Studio albums"]
+    assert pages[0]["introduction"] == "Introduction of the page."